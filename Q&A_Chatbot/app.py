@@ -1,23 +1,35 @@
 import os
 import streamlit as st
-import tempfile
 from dotenv import load_dotenv
-from langchain.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Pinecone as LangPinecone
 from langchain_groq import ChatGroq
-from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
 from pinecone import Pinecone, ServerlessSpec
-import pdfplumber
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
+from langchain.retrievers import EnsembleRetriever
 import time
+import re
+import uuid
+from collections import OrderedDict
+from context_packing import BudgetedQA
+from conversation import ConversationMemory, QuestionCondenser
+from document_index import DocumentIndex
+from embedding_service import CachedEmbeddings
+from hybrid_retriever import RERANKER_MODEL, CrossEncoderReranker, HybridRetriever, SparseIndex
+from ingestion_jobs import DONE, FAILED, IngestionQueue
+from local_vectorstore import LocalVectorStore
 
 # Load environment variables
 load_dotenv()
 groq_api_key = os.getenv("GROQ_API_KEY")
 pinecone_api_key = os.getenv("PINECONE_API_KEY")
 pinecone_env = os.getenv("PINECONE_ENV")
+# "pinecone" or "local"; defaults to the local index when no Pinecone key is configured
+vector_backend = os.getenv("VECTOR_BACKEND", "pinecone" if pinecone_api_key else "local").lower()
+local_index_dir = os.getenv("LOCAL_INDEX_DIR", ".vector_index")
+# "hybrid" fuses BM25 with dense results; "dense" uses MMR over embeddings only
+retrieval_mode = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+# Chunks embedded per batch while later pages are still being parsed
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64))
 
 # App configuration
 st.set_page_config(
@@ -48,171 +60,335 @@ def init_pinecone():
         )
     return pc, index_name
 
-# Load and split PDF
-def load_and_split_pdf(file_path):
-    with pdfplumber.open(file_path) as pdf:
-        text = "\n".join([page.extract_text() for page in pdf.pages if page.extract_text()])
-    
-    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    return splitter.create_documents([text])
-
-# Create embedding model
+# Create embedding model; chunk vectors are cached on disk by content hash
 @st.cache_resource
 def get_embedding_model():
-    return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    return CachedEmbeddings()
+
+# Open the configured vector backend once per process; local vectors are memory-mapped
+@st.cache_resource
+def init_vectorstore():
+    if vector_backend == "local":
+        return LocalVectorStore(get_embedding_model(), persist_directory=local_index_dir)
+    pc, index_name = init_pinecone()
+    return LangPinecone.from_existing_index(index_name=index_name, embedding=get_embedding_model())
+
+# BM25 index per document, updated alongside the vector store
+@st.cache_resource
+def get_sparse_index():
+    return SparseIndex()
+
+# Optional cross-encoder that reorders the fused candidates
+@st.cache_resource
+def get_reranker():
+    return CrossEncoderReranker(RERANKER_MODEL) if RERANKER_MODEL else None
+
+# Per-document namespaces with content-hash chunk IDs; documents idle past the retention period are removed
+@st.cache_resource
+def get_document_index():
+    document_index = DocumentIndex(init_vectorstore(), sparse=get_sparse_index())
+    document_index.prune()
+    return document_index
+
+# One ingestion worker pool for all sessions, so uploads never block a session's script run
+@st.cache_resource
+def get_ingestion_queue():
+    return IngestionQueue(get_document_index(), batch_size=EMBED_BATCH_SIZE)
+
+# LLM settings; part of the cache key for the QA chain
+LLM_CONFIG = {
+    "model_name": "llama3-8b-8192",
+    "temperature": 0.2,
+    "top_p": 0.9,
+    "max_tokens": int(os.getenv("LLM_MAX_TOKENS", 1024)),
+}
+
+# Prompt tokens available for retrieved context; "trim" cuts to fit, "map_reduce" answers over all chunks instead
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))
+CONTEXT_OVERFLOW = os.getenv("CONTEXT_OVERFLOW", "trim").lower()
+
+# Retriever settings: chunks sent to the LLM, and candidates fetched per retriever before fusion/reranking
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", 5))
+RETRIEVER_FETCH_K = int(os.getenv("RETRIEVER_FETCH_K", 20))
+
+# Answers remembered per document selection, keyed by normalized question and document versions
+ANSWER_CACHE_SIZE = 256
+
+# Most recent chat messages always rendered; earlier ones only on request
+CHAT_WINDOW = int(os.getenv("CHAT_WINDOW", 20))
+# Oldest messages are dropped from the session beyond this many
+CHAT_HISTORY_LIMIT = int(os.getenv("CHAT_HISTORY_LIMIT", 200))
+# Follow-ups are rewritten into standalone questions from the conversation before retrieval
+conversational_retrieval = os.getenv("CONVERSATIONAL_RETRIEVAL", "true").lower() == "true"
+# Recent turns kept verbatim for condensing; older turns are summarized
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 800))
+
+QA_PROMPT = PromptTemplate(
+    template=(
+        "You are an expert assistant that helps answer questions based on the provided context.\n\n"
+        "Context:\n{context}\n\n"
+        "Question: {question}\n\n"
+        "Instructions:\n"
+        "1. Answer the question based on the context provided.\n"
+        "2. If the answer is not in the context, say \"I don't have enough information to answer this question.\"\n"
+        "3. Be concise but thorough in your response.\n"
+        "4. If relevant, include the source document name and page number in your answer.\n"
+        "5. Format your answer in clear, easy-to-read paragraphs.\n"
+        "6. Use bullet points or numbered lists when appropriate.\n\n"
+        "Answer:"
+    ),
+    input_variables=["context", "question"],
+)
 
 # Initialize LLM without system_prompt
 @st.cache_resource
 def init_llm():
-    return ChatGroq(
-        api_key=groq_api_key,
-        model_name="llama3-8b-8192",
-        temperature=0.2,
-        top_p=0.9,
-        max_tokens=1024
-    )
+    return ChatGroq(api_key=groq_api_key, **LLM_CONFIG)
+
+# Build the retriever and RAG chain once per document selection and LLM config
+def get_qa_chain():
+    namespaces = st.session_state.document_namespaces
+    key = (id(st.session_state.vectorstore), tuple(namespaces), tuple(sorted(LLM_CONFIG.items())),
+           CONTEXT_TOKEN_BUDGET, CONTEXT_OVERFLOW)
+    if st.session_state.qa_chain is None or st.session_state.qa_chain_key != key:
+        if retrieval_mode == "hybrid":
+            retriever = HybridRetriever(
+                vectorstore=st.session_state.vectorstore,
+                sparse=get_sparse_index(),
+                namespaces=namespaces,
+                k=RETRIEVER_K,
+                fetch_k=RETRIEVER_FETCH_K,
+                reranker=get_reranker()
+            )
+        else:
+            # Maximal Marginal Relevance for better diversity, one retriever per document
+            retrievers = [
+                st.session_state.vectorstore.as_retriever(
+                    search_type="mmr",
+                    search_kwargs={"k": RETRIEVER_K, "fetch_k": RETRIEVER_FETCH_K, "namespace": namespace}
+                )
+                for namespace in namespaces
+            ]
+            retriever = retrievers[0] if len(retrievers) == 1 else EnsembleRetriever(
+                retrievers=retrievers, weights=[1 / len(retrievers)] * len(retrievers)
+            )
+        # Deduplicated chunks packed into the token budget for a single "stuff" prompt
+        st.session_state.qa_chain = BudgetedQA(
+            llm=init_llm(),
+            retriever=retriever,
+            prompt=QA_PROMPT,
+            budget_tokens=CONTEXT_TOKEN_BUDGET,
+            overflow=CONTEXT_OVERFLOW
+        )
+        st.session_state.qa_chain_key = key
+    return st.session_state.qa_chain
+
+# Questions differing only in case, spacing or trailing punctuation share a cache entry
+def normalize_question(question):
+    return re.sub(r"\s+", " ", question).strip().rstrip("?!. ").lower()
+
+# The selected documents and their update times; re-indexing one of them misses the answer cache,
+# while switching back to an earlier selection finds its answers again
+def document_versions():
+    documents = get_document_index().documents(st.session_state.owner)
+    return tuple((namespace, documents.get(namespace, {}).get("updated"))
+                 for namespace in st.session_state.document_namespaces)
+
+def reset_document_state():
+    st.session_state.qa_chain = None
+    st.session_state.qa_chain_key = None
+
+# Point the chat at the selected documents; the chain is rebuilt on the next question
+def apply_document_selection():
+    st.session_state.vectorstore = init_vectorstore()
+    st.session_state.document_namespaces = list(st.session_state.document_selection)
+    get_document_index().registry.touch(st.session_state.document_namespaces)
+    reset_document_state()
+
+# Documents belong to the signed-in user when Streamlit authentication is configured, otherwise to an
+# unguessable token kept in the page URL, so reopening the same link finds the same documents
+def current_owner():
+    if st.user.get("is_logged_in") and st.user.get("email"):
+        return f"user:{st.user['email']}"
+    token = st.query_params.get("owner", "")
+    if not re.fullmatch(r"[0-9a-f]{32}", token):
+        token = uuid.uuid4().hex
+        st.query_params["owner"] = token
+    return f"link:{token}"
 
 # Session state initialization
+if 'owner' not in st.session_state:
+    # Documents are namespaced, listed and deleted per owner
+    st.session_state.owner = current_owner()
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
+if 'memory' not in st.session_state:
+    st.session_state.memory = ConversationMemory(init_llm(), max_tokens=HISTORY_TOKEN_BUDGET)
+if 'condenser' not in st.session_state:
+    st.session_state.condenser = QuestionCondenser(init_llm())
 if 'vectorstore' not in st.session_state:
     st.session_state.vectorstore = None
-if 'pdf_processed' not in st.session_state:
-    st.session_state.pdf_processed = False
-if 'query' not in st.session_state:
-    st.session_state.query = ""
-if 'last_response_time' not in st.session_state:
-    st.session_state.last_response_time = 0
+if 'document_namespaces' not in st.session_state:
+    st.session_state.document_namespaces = []
+if 'document_selection' not in st.session_state:
+    st.session_state.document_selection = []
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = []
+if 'applied_jobs' not in st.session_state:
+    st.session_state.applied_jobs = set()
+if 'show_earlier_messages' not in st.session_state:
+    st.session_state.show_earlier_messages = False
+if 'qa_chain' not in st.session_state:
+    reset_document_state()
+if 'answer_cache' not in st.session_state:
+    st.session_state.answer_cache = OrderedDict()
 
 # Sidebar for PDF upload
 with st.sidebar:
-    st.header("Upload Document")
-    uploaded_file = st.file_uploader("Choose a PDF file", type="pdf")
+    st.header("Upload Documents")
+    uploaded_files = st.file_uploader("Choose PDF files", type="pdf", accept_multiple_files=True)
     
-    if uploaded_file is not None:
-        # Create a temporary file to store the uploaded PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_filepath = tmp_file.name
+    if uploaded_files and st.button("Process Documents"):
+        get_document_index().prune()
+        # Queue each upload; a temporary file exists only while its job runs
+        for uploaded_file in uploaded_files:
+            job = get_ingestion_queue().submit(uploaded_file.name, uploaded_file.getvalue(), st.session_state.owner)
+            st.session_state.jobs.append(job.id)
+    
+    # Progress of this session's ingestion jobs
+    jobs = [job for job in map(get_ingestion_queue().get, st.session_state.jobs) if job is not None]
+    st.session_state.jobs = [job.id for job in jobs]
+    if jobs:
+        st.header("Processing")
+        for job in jobs:
+            if job.status == DONE:
+                st.success(f"Document processed: {job.name} ({job.message})")
+                # Finished documents join the session's selection once
+                if job.id not in st.session_state.applied_jobs:
+                    st.session_state.applied_jobs.add(job.id)
+                    if job.namespace not in st.session_state.document_selection:
+                        st.session_state.document_selection = st.session_state.document_selection + [job.namespace]
+            elif job.status == FAILED:
+                st.error(f"{job.name}: {job.message}")
+            else:
+                st.progress(job.progress, text=f"{job.name}: {job.message}")
+        if not any(job.active for job in jobs) and st.button("Clear"):
+            st.session_state.jobs = []
+            st.rerun()
+    
+    # Documents already in the index can be queried together or removed
+    indexed_documents = get_document_index().documents(st.session_state.owner)
+    st.session_state.document_selection = [
+        namespace for namespace in st.session_state.document_selection if namespace in indexed_documents
+    ]
+    if st.session_state.document_selection != st.session_state.document_namespaces:
+        apply_document_selection()
+    if indexed_documents:
+        st.header("Indexed Documents")
+        st.multiselect(
+            "Ask questions about",
+            options=list(indexed_documents),
+            format_func=lambda namespace: indexed_documents[namespace]["name"],
+            key="document_selection"
+        )
+        with st.expander("Manage documents"):
+            for namespace, entry in indexed_documents.items():
+                name_col, delete_col = st.columns([3, 1])
+                name_col.markdown(f"{entry['name']} · {len(entry['ids'])} chunks")
+                if delete_col.button("Delete", key=f"delete_{namespace}"):
+                    get_document_index().delete_document(namespace, st.session_state.owner)
+                    st.rerun()
+
+# Page/chunk citations for the documents an answer was built from
+def format_sources(documents):
+    return list(dict.fromkeys(
+        f"{doc.metadata.get('source', 'Document')} p. {doc.metadata.get('page', 'N/A')}"
+        + (f" (chunk {doc.metadata['chunk']})" if "chunk" in doc.metadata else "")
+        for doc in documents
+    ))
+
+def render_message(message):
+    with st.chat_message(message["role"]):
+        st.markdown(message["content"])
+        if message.get("sources"):
+            st.caption("Sources: " + ", ".join(message["sources"]))
+
+# Stream the answer into the current chat message; citations arrive after the last token
+def stream_answer(question):
+    if conversational_retrieval:
+        with st.spinner("Reading conversation..."):
+            standalone = st.session_state.condenser.condense(question, st.session_state.memory)
+        if standalone != question:
+            st.caption(f"Searching for: {standalone}")
+            question = standalone
+    cache_key = (normalize_question(question), document_versions())
+    cached = st.session_state.answer_cache.get(cache_key)
+    if cached is not None:
+        # Reuse a previous answer to the same question about these documents
+        st.session_state.answer_cache.move_to_end(cache_key)
+        answer, sources = cached
+        st.markdown(answer)
+    else:
+        source_documents = []
         
-        if st.button("Process Document"):
-            with st.spinner("Processing PDF..."):
-                try:
-                    # Initialize Pinecone
-                    pc, index_name = init_pinecone()
-                    
-                    # Load and split PDF
-                    docs = load_and_split_pdf(tmp_filepath)
-                    
-                    # Get embedding model
-                    embedding_model = get_embedding_model()
-                    
-                    # Create vectorstore
-                    st.session_state.vectorstore = LangPinecone.from_documents(
-                        documents=docs,
-                        embedding=embedding_model,
-                        index_name=index_name
-                    )
-                    
-                    st.session_state.pdf_processed = True
-                    st.success(f"Document processed: {uploaded_file.name}")
-                    
-                except Exception as e:
-                    st.error(f"Error processing document: {e}")
-                finally:
-                    # Clean up the temporary file
-                    os.unlink(tmp_filepath)
-
-# Define callback for query submission
-def submit_query():
-    if st.session_state.query_input and st.session_state.query_input != st.session_state.query:
-        # Store the current query
-        current_query = st.session_state.query_input
+        def answer_tokens():
+            for kind, payload in get_qa_chain().stream(question):
+                if kind == "token":
+                    yield payload
+                else:
+                    source_documents.extend(payload)
         
-        # Update session state with current query to prevent duplication
-        st.session_state.query = current_query
-        st.session_state.last_response_time = time.time()
+        with st.spinner("Searching documents..."):
+            events = answer_tokens()
+            first_token = next(events, "")
         
-        # Update chat history with user query
-        st.session_state.chat_history.append({"role": "user", "content": current_query})
+        def tokens():
+            yield first_token
+            yield from events
         
-        # Initialize LLM and get answer
-        with st.spinner("Thinking..."):
-            # Initialize LLM
-            llm = init_llm()
-            
-            # Configure retriever with better parameters
-            retriever = st.session_state.vectorstore.as_retriever(
-                search_type="mmr",  # Use Maximal Marginal Relevance for better diversity
-                search_kwargs={"k": 5}  # Get top 5 relevant chunks
-            )
-            
-            # Build the enhanced RAG chain with better prompt
-            qa_chain = RetrievalQA.from_chain_type(
-                llm=llm,
-                chain_type="stuff",
-                retriever=retriever,
-                return_source_documents=True,
-                chain_type_kwargs={
-                    "prompt": PromptTemplate(
-                        template=(
-                            "You are an expert assistant that helps answer questions based on the provided context.\n\n"
-                            "Context:\n{context}\n\n"
-                            "Question: {question}\n\n"
-                            "Instructions:\n"
-                            "1. Answer the question based on the context provided.\n"
-                            "2. If the answer is not in the context, say \"I don't have enough information to answer this question.\"\n"
-                            "3. Be concise but thorough in your response.\n"
-                            "4. If relevant, include the source document name and page number in your answer.\n"
-                            "5. Format your answer in clear, easy-to-read paragraphs.\n"
-                            "6. Use bullet points or numbered lists when appropriate.\n\n"
-                            "Answer:"
-                        ),
-                        input_variables=["context", "question"],
-                    )
-                }
-            )
-            
-            # Get answer with source documents
-            result = qa_chain.invoke({"query": current_query})
-            answer = result['result']
-            
-            # Add source documents if available
-            if 'source_documents' in result and result['source_documents']:
-                sources = list(set(
-                    f"Page {doc.metadata.get('page', 'N/A')}" 
-                    for doc in result['source_documents']
-                ))
-                if sources:
-                    answer += f"\n\nSources: {', '.join(sources)}"
-            
-            # Update chat history with AI response
-            st.session_state.chat_history.append({"role": "assistant", "content": answer})
+        answer = st.write_stream(tokens())
+        sources = format_sources(source_documents)
+        st.session_state.answer_cache[cache_key] = (answer, sources)
+        if len(st.session_state.answer_cache) > ANSWER_CACHE_SIZE:
+            st.session_state.answer_cache.popitem(last=False)
+    if sources:
+        st.caption("Sources: " + ", ".join(sources))
+    return answer, sources
 
 # Main chat area
-if st.session_state.pdf_processed:
-    # Display chat history in a container
-    chat_container = st.container()
-    with chat_container:
-        for message in st.session_state.chat_history:
-            if message["role"] == "user":
-                st.markdown(f"**You:** {message['content']}")
-            else:
-                # Format AI response with better markdown
-                response = message['content']
-                # Convert line breaks to markdown paragraphs
-                response = response.replace('\n', '  \n\n')
-                st.markdown(f"**AI:** {response}", unsafe_allow_html=True)
+if st.session_state.document_namespaces:
+    history = st.session_state.chat_history
+    earlier = len(history) - CHAT_WINDOW
+    if earlier > 0:
+        st.toggle(f"Show {earlier} earlier messages", key="show_earlier_messages")
+    # Only the recent window is rendered unless earlier messages are requested
+    start = 0 if st.session_state.show_earlier_messages else max(0, earlier)
+    for message in history[start:]:
+        render_message(message)
     
-    # Query input with callback
-    st.text_input(
-        "Ask a question about the document:", 
-        key="query_input",
-        on_change=submit_query
-    )
+    question = st.chat_input("Ask a question about the selected documents")
+    if question:
+        user_message = {"role": "user", "content": question}
+        history.append(user_message)
+        render_message(user_message)
+        with st.chat_message("assistant"):
+            try:
+                answer, sources = stream_answer(question)
+                history.append({"role": "assistant", "content": answer, "sources": sources})
+                if conversational_retrieval:
+                    st.session_state.memory.add("user", question)
+                    st.session_state.memory.add("assistant", answer)
+            except Exception as e:
+                st.error(f"Error answering question: {e}")
+        del history[:-CHAT_HISTORY_LIMIT]
 else:
-    st.info("Please upload and process a document to start the conversation.")
+    st.info("Please upload and process a document, or select an indexed one, to start the conversation.")
 
 # Footer
 st.markdown("---")
 st.markdown("Built with Streamlit, Langchain, and GROQ LLM")
+
+# Poll while this session has ingestion jobs in flight
+if any(job.active for job in jobs):
+    time.sleep(1)
+    st.rerun()
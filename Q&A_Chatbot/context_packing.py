@@ -0,0 +1,155 @@
+"""Token-budgeted context packing for the question-answering prompt.
+
+Retrieved chunks are deduplicated before they reach the prompt: chunks that
+are near-copies of a better-ranked one are dropped, and the text a chunk shares
+with its neighbour through the splitter's overlap is cut. The remaining chunks
+are packed in rank order into a token budget, and the last one that only
+partly fits is trimmed at a sentence boundary. With ``overflow="map_reduce"``
+a context that exceeds the budget is answered with a map-reduce chain over
+all chunks instead of being trimmed; both its steps use the same prompt, so
+the answer keeps the app's instructions and format.
+"""
+import re
+
+from langchain.chains.question_answering import load_qa_chain
+from langchain.schema import Document
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _ENCODING = None
+
+NEAR_DUPLICATE_THRESHOLD = 0.8
+SHINGLE_SIZE = 3
+# Longest shared prefix/suffix searched for between two chunks; the splitter overlap is 50 chars
+MAX_OVERLAP_CHARS = 200
+MIN_OVERLAP_CHARS = 20
+# A partly fitting chunk is trimmed only if at least this many tokens of it fit
+MIN_TRIM_TOKENS = 48
+
+
+def count_tokens(text):
+    """Approximate the model's token count (tiktoken when installed, else ~4 chars/token)."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def _shingles(text):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _overlap(previous, text):
+    # Length of the longest suffix of ``previous`` that ``text`` starts with
+    for size in range(min(MAX_OVERLAP_CHARS, len(previous), len(text)), MIN_OVERLAP_CHARS - 1, -1):
+        if text.startswith(previous[-size:]):
+            return size
+    return 0
+
+
+def remove_near_duplicates(docs, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """Drop chunks whose word shingles mostly repeat a better-ranked chunk and cut splitter overlap."""
+    kept = []
+    kept_shingles = []
+    for doc in docs:
+        shingles = _shingles(doc.page_content)
+        if any(len(shingles & other) / max(1, len(shingles | other)) >= threshold for other in kept_shingles):
+            continue
+        text = doc.page_content
+        for other in kept:
+            # Drop the overlap on whichever side this chunk touches an already kept neighbour
+            cut = _overlap(other.page_content, text)
+            if cut:
+                text = text[cut:].lstrip()
+                continue
+            cut = _overlap(text, other.page_content)
+            if cut:
+                text = text[:-cut].rstrip()
+        kept.append(Document(page_content=text, metadata=doc.metadata) if text != doc.page_content else doc)
+        kept_shingles.append(shingles)
+    return kept
+
+
+def _trim(text, max_tokens):
+    if _ENCODING is not None:
+        text = _ENCODING.decode(_ENCODING.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        text = text[:max_tokens * 4]
+    # Prefer ending on a sentence boundary when one is reasonably close
+    boundary = max(text.rfind(". "), text.rfind(".\n"))
+    if boundary > len(text) // 2:
+        text = text[:boundary + 1]
+    return text + " …"
+
+
+def pack_documents(docs, budget_tokens):
+    """Fit ``docs`` (in rank order) into ``budget_tokens``; returns ``(packed, overflowed)``."""
+    packed = []
+    used = 0
+    for i, doc in enumerate(docs):
+        tokens = count_tokens(doc.page_content)
+        if used + tokens <= budget_tokens:
+            packed.append(doc)
+            used += tokens
+            continue
+        remaining = budget_tokens - used
+        if remaining >= MIN_TRIM_TOKENS:
+            packed.append(Document(page_content=_trim(doc.page_content, remaining), metadata=doc.metadata))
+        return packed, docs[i:]
+    return packed, []
+
+
+class BudgetedQA:
+    """Retrieve, deduplicate and pack chunks into a token budget, then answer.
+
+    ``invoke({"query": ...})`` returns ``{"result", "source_documents"}`` like
+    ``RetrievalQA``; ``stream(question)`` yields the answer as it is generated.
+    ``overflow`` is ``"trim"`` (always one stuffed prompt) or ``"map_reduce"``
+    (map-reduce over all chunks when they do not fit).
+    """
+
+    def __init__(self, llm, retriever, prompt, budget_tokens, overflow="trim"):
+        self.llm = llm
+        self.prompt = prompt
+        self.retriever = retriever
+        self.budget_tokens = budget_tokens
+        self.overflow = overflow
+        self.stuff_chain = load_qa_chain(llm, chain_type="stuff", prompt=prompt)
+        self.map_reduce_chain = None
+        if overflow == "map_reduce":
+            # Each chunk is answered with ``prompt``, then the partial answers are combined with it as the context
+            self.map_reduce_chain = load_qa_chain(
+                llm, chain_type="map_reduce", question_prompt=prompt, combine_prompt=prompt,
+                combine_document_variable_name="context"
+            )
+
+    def prepare(self, question):
+        """Pick the chain and its inputs for ``question``; returns ``(chain, inputs, sources)``."""
+        docs = remove_near_duplicates(self.retriever.invoke(question))
+        packed, overflowed = pack_documents(docs, self.budget_tokens)
+        if overflowed and self.map_reduce_chain is not None:
+            return self.map_reduce_chain, {"input_documents": docs, "question": question}, docs
+        return self.stuff_chain, {"input_documents": packed, "question": question}, packed
+
+    def invoke(self, inputs):
+        chain, chain_inputs, sources = self.prepare(inputs["query"])
+        result = chain.invoke(chain_inputs)
+        return {"result": result["output_text"], "source_documents": sources}
+
+    def stream(self, question):
+        """Yield ``("token", text)`` events as the answer is generated, then one ``("sources", documents)``."""
+        chain, chain_inputs, sources = self.prepare(question)
+        if chain is self.stuff_chain:
+            context = "\n\n".join(doc.page_content for doc in chain_inputs["input_documents"])
+            for chunk in self.llm.stream(self.prompt.format(context=context, question=question)):
+                text = getattr(chunk, "content", chunk)
+                if text:
+                    yield "token", text
+        else:
+            # Map-reduce answers only exist once the reduce step finishes
+            yield "token", chain.invoke(chain_inputs)["output_text"]
+        yield "sources", sources
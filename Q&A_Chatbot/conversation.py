@@ -0,0 +1,121 @@
+"""Conversation memory and follow-up question condensing for retrieval.
+
+Follow-up questions ("what about section 3?") retrieve poorly on their own,
+so they are rewritten into standalone questions from the conversation before
+retrieval. Rewrites are cached per conversation state, and questions that
+carry no reference to earlier turns skip the LLM call entirely.
+
+Memory is bounded by tokens: recent turns are kept verbatim up to a budget
+and older turns are folded into a running summary.
+"""
+import hashlib
+import re
+from collections import OrderedDict
+
+from langchain.prompts import PromptTemplate
+
+from context_packing import count_tokens
+
+HISTORY_TOKEN_BUDGET = 800
+CONDENSE_CACHE_SIZE = 256
+
+CONDENSE_PROMPT = PromptTemplate(
+    template=(
+        "Given the conversation below and a follow-up question, rewrite the follow-up as a standalone "
+        "question that can be understood without the conversation. Keep names, numbers and section "
+        "references. Return only the question.\n\n"
+        "Earlier conversation (summary):\n{summary}\n\n"
+        "Recent conversation:\n{history}\n\n"
+        "Follow-up question: {question}\n\n"
+        "Standalone question:"
+    ),
+    input_variables=["summary", "history", "question"],
+)
+
+SUMMARY_PROMPT = PromptTemplate(
+    template=(
+        "Progressively summarize the conversation between a user and an assistant about their documents, "
+        "adding the new lines to the existing summary. Keep the topics, names, numbers and sections "
+        "discussed. Return only the new summary.\n\n"
+        "Current summary:\n{summary}\n\n"
+        "New lines:\n{lines}\n\n"
+        "New summary:"
+    ),
+    input_variables=["summary", "lines"],
+)
+
+# Words that usually point back at an earlier turn
+_REFERENCE = re.compile(
+    r"\b(it|its|this|that|these|those|they|them|their|he|she|him|her|his|hers|there|"
+    r"above|previous|earlier|same|also|else|more|another|other|former|latter|what about|how about)\b",
+    re.IGNORECASE,
+)
+FOLLOW_UP_MAX_WORDS = 5
+
+
+def _text(response):
+    return getattr(response, "content", response).strip()
+
+
+def looks_like_follow_up(question):
+    """Cheap check for questions that depend on earlier turns (references or very short)."""
+    return bool(_REFERENCE.search(question)) or len(question.split()) <= FOLLOW_UP_MAX_WORDS
+
+
+class ConversationMemory:
+    """Recent turns kept verbatim within ``max_tokens``; older turns summarized by the LLM."""
+
+    def __init__(self, llm, max_tokens=HISTORY_TOKEN_BUDGET):
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self.summary = ""
+        self.turns = []
+
+    def __bool__(self):
+        return bool(self.summary or self.turns)
+
+    @staticmethod
+    def _line(role, content):
+        return f"{'User' if role == 'user' else 'Assistant'}: {content}"
+
+    def history_text(self):
+        return "\n".join(self._line(role, content) for role, content in self.turns)
+
+    def add(self, role, content):
+        self.turns.append((role, content))
+        overflow = []
+        while len(self.turns) > 2 and count_tokens(self.history_text()) > self.max_tokens:
+            overflow.append(self.turns.pop(0))
+        if overflow:
+            lines = "\n".join(self._line(role, content) for role, content in overflow)
+            self.summary = _text(self.llm.invoke(
+                SUMMARY_PROMPT.format(summary=self.summary or "(none)", lines=lines)
+            ))
+
+    def state_key(self):
+        """Hash of everything a condensed question depends on besides the question itself."""
+        return hashlib.sha256(f"{self.summary}\x00{self.history_text()}".encode("utf-8")).hexdigest()
+
+
+class QuestionCondenser:
+    """Rewrites follow-ups into standalone questions, caching rewrites per conversation state."""
+
+    def __init__(self, llm, cache_size=CONDENSE_CACHE_SIZE):
+        self.llm = llm
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def condense(self, question, memory):
+        if not memory or not looks_like_follow_up(question):
+            return question
+        key = (memory.state_key(), re.sub(r"\s+", " ", question).strip().rstrip("?!. ").lower())
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        standalone = _text(self.llm.invoke(CONDENSE_PROMPT.format(
+            summary=memory.summary or "(none)", history=memory.history_text(), question=question
+        ))) or question
+        self._cache[key] = standalone
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return standalone
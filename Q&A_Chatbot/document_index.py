@@ -0,0 +1,239 @@
+"""Per-document namespaces and incremental upserts on top of a vector store.
+
+Each document gets its own namespace derived from its owner (a stable user
+identity, see ``app.py``) and file name, and each chunk an id derived from
+the namespace and chunk text, so two users uploading different
+``report.pdf`` files never share vectors. Re-processing a
+document therefore only embeds chunks whose text changed, deletes chunks that
+disappeared, and never duplicates vectors; chunks whose text is unchanged but
+whose page or position moved get their metadata rewritten. A small JSON
+registry records the chunk ids, a fingerprint of each chunk's metadata and the
+owner per namespace so stale chunks can be found without
+listing the index, for both the local store and Pinecone, and so each owner
+only lists and deletes its own documents. Documents nobody has processed or
+selected for ``DOCUMENT_RETENTION_DAYS`` are deleted by ``prune``.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+DOCUMENT_REGISTRY_PATH = os.getenv("DOCUMENT_REGISTRY_PATH", ".document_registry.json")
+# 0 keeps documents forever
+DOCUMENT_RETENTION_DAYS = float(os.getenv("DOCUMENT_RETENTION_DAYS", 30))
+
+
+def document_namespace(name, owner=None):
+    """Stable namespace for an owner's document, e.g. ``Annual Report.pdf`` -> ``annual-report-pdf-1a2b3c4d``."""
+    slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")[:48]
+    key = name if owner is None else f"{owner}\x00{name}"
+    return f"{slug}-{hashlib.sha256(key.encode('utf-8')).hexdigest()[:8]}"
+
+
+def chunk_id(namespace, text):
+    return hashlib.sha256(f"{namespace}\x00{text}".encode("utf-8")).hexdigest()[:32]
+
+
+def metadata_fingerprint(metadata):
+    return hashlib.sha256(json.dumps(metadata, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+class DocumentRegistry:
+    """JSON file mapping namespace -> document name, owner, chunk ids and fingerprints, update and last-use times."""
+
+    def __init__(self, path=DOCUMENT_REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._documents = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._documents = json.load(f)
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._documents, f)
+        os.replace(tmp, self.path)
+
+    def get(self, namespace):
+        with self._lock:
+            entry = self._documents.get(namespace)
+            return dict(entry) if entry else None
+
+    def documents(self, owner=None):
+        """``{namespace: entry}`` of ``owner``'s documents, sorted by most recently updated."""
+        with self._lock:
+            items = sorted(self._documents.items(), key=lambda item: item[1]["updated"], reverse=True)
+            return {namespace: dict(entry) for namespace, entry in items if entry.get("owner") == owner}
+
+    def put(self, namespace, name, ids, owner=None, fingerprints=None):
+        with self._lock:
+            self._documents[namespace] = {"name": name, "owner": owner, "ids": list(ids),
+                                          "fingerprints": list(fingerprints or []), "updated": time.time()}
+            self._save()
+
+    def touch(self, namespaces):
+        """Record that ``namespaces`` are in use, postponing their expiry."""
+        with self._lock:
+            now = time.time()
+            for namespace in namespaces:
+                if namespace in self._documents:
+                    self._documents[namespace]["used"] = now
+            self._save()
+
+    def idle_since(self, cutoff):
+        """Namespaces neither updated nor used since ``cutoff``, whoever owns them."""
+        with self._lock:
+            return [namespace for namespace, entry in self._documents.items()
+                    if max(entry["updated"], entry.get("used", 0)) < cutoff]
+
+    def remove(self, namespace):
+        with self._lock:
+            if self._documents.pop(namespace, None) is not None:
+                self._save()
+
+
+class DocumentIndex:
+    """Namespaced, deduplicating writes to a LangChain vector store.
+
+    The store must accept ``namespace=`` on ``add_texts`` and ``delete`` (as
+    both ``LocalVectorStore`` and LangChain's Pinecone store do). An optional
+    ``sparse`` index (``hybrid_retriever.SparseIndex``) is kept in sync. Indexes
+    with ``batch_writes()`` persist once per document rather than per batch.
+    """
+
+    def __init__(self, store, registry=None, sparse=None):
+        self.store = store
+        self.registry = registry or DocumentRegistry()
+        self.sparse = sparse
+        # Concurrent uploads of the same document are serialized; different documents run in parallel
+        self._namespace_locks = defaultdict(threading.Lock)
+
+    def upsert_document(self, name, chunks, owner=None, batch_size=64, on_progress=None):
+        """Index ``chunks`` (an iterable of ``Document``) as ``owner``'s document ``name``.
+
+        Returns ``(namespace, stats)`` where stats counts ``added``,
+        ``updated`` (same text, new metadata such as a page number),
+        ``unchanged`` and ``removed`` chunks. ``on_progress`` is called with
+        the latest chunk every ``batch_size`` chunks.
+        """
+        namespace = document_namespace(name, owner)
+        with self._namespace_locks[namespace]:
+            with self._batch_writes():
+                stats = self._upsert(namespace, chunks, batch_size, on_progress)
+            # Recorded only once the store has persisted the chunks it lists
+            self.registry.put(namespace, name, stats.pop("ids"), owner, stats.pop("fingerprints"))
+        return namespace, stats
+
+    def _batch_writes(self):
+        stack = ExitStack()
+        for index in (self.store, self.sparse):
+            if hasattr(index, "batch_writes"):
+                stack.enter_context(index.batch_writes())
+        return stack
+
+    def _upsert(self, namespace, chunks, batch_size, on_progress):
+        previous = self.registry.get(namespace)
+        known = set(previous["ids"]) if previous else set()
+        # Entries written before fingerprints were recorded have none, so their metadata is refreshed once
+        known_fingerprints = dict(zip(previous["ids"], previous.get("fingerprints", []))) if previous else {}
+        # Checked separately so documents indexed before the sparse index existed get backfilled
+        sparse_known = self.sparse.ids(namespace) if self.sparse is not None else set()
+        seen = []
+        seen_set = set()
+        fingerprints = []
+        stats = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0}
+
+        batch = []
+        sparse_batch = []
+
+        def flush():
+            if batch:
+                self.store.add_texts(
+                    [doc.page_content for _, doc in batch],
+                    metadatas=[dict(doc.metadata, namespace=namespace) for _, doc in batch],
+                    ids=[id_ for id_, _ in batch],
+                    namespace=namespace,
+                )
+                batch.clear()
+            if sparse_batch:
+                self.sparse.add(
+                    namespace,
+                    [id_ for id_, _ in sparse_batch],
+                    [doc.page_content for _, doc in sparse_batch],
+                    [doc.metadata for _, doc in sparse_batch],
+                )
+                sparse_batch.clear()
+
+        for doc in chunks:
+            id_ = chunk_id(namespace, doc.page_content)
+            if id_ in seen_set:
+                continue  # identical chunk text repeated within the document
+            seen.append(id_)
+            seen_set.add(id_)
+            fingerprints.append(metadata_fingerprint(doc.metadata))
+            # Same text at a new page or position: rewritten so citations follow it
+            moved = id_ in known and known_fingerprints.get(id_) != fingerprints[-1]
+            if self.sparse is not None and (id_ not in sparse_known or moved):
+                sparse_batch.append((id_, doc))
+            if id_ not in known:
+                stats["added"] += 1
+                batch.append((id_, doc))
+            elif moved:
+                stats["updated"] += 1
+                batch.append((id_, doc))
+            else:
+                stats["unchanged"] += 1
+            if len(batch) >= batch_size or len(sparse_batch) >= batch_size:
+                flush()
+            if on_progress and len(seen) % batch_size == 0:
+                on_progress(doc)
+        flush()
+
+        stale = [id_ for id_ in known if id_ not in seen_set]
+        if stale:
+            self.store.delete(ids=stale, namespace=namespace)
+            if self.sparse is not None:
+                self.sparse.delete(namespace, stale)
+            stats["removed"] = len(stale)
+        return dict(stats, ids=seen, fingerprints=fingerprints)
+
+    def delete_document(self, namespace, owner=None):
+        """Remove every vector of ``owner``'s document and forget it; returns ``False`` if it is not theirs."""
+        with self._namespace_locks[namespace]:
+            entry = self.registry.get(namespace)
+            if entry is None or entry.get("owner") != owner:
+                return False
+            self._drop(namespace, entry)
+        return True
+
+    def _drop(self, namespace, entry):
+        if entry["ids"]:
+            self.store.delete(ids=entry["ids"], namespace=namespace)
+        if self.sparse is not None:
+            self.sparse.drop(namespace)
+        self.registry.remove(namespace)
+
+    def prune(self, retention_days=DOCUMENT_RETENTION_DAYS):
+        """Delete documents idle for ``retention_days``, e.g. those of owners who never come back."""
+        if not retention_days:
+            return []
+        cutoff = time.time() - retention_days * 24 * 60 * 60
+        pruned = []
+        for namespace in self.registry.idle_since(cutoff):
+            with self._namespace_locks[namespace]:
+                # Re-checked under the lock in case the document was just re-processed
+                entry = self.registry.get(namespace)
+                if entry and max(entry["updated"], entry.get("used", 0)) < cutoff:
+                    self._drop(namespace, entry)
+                    pruned.append(namespace)
+        return pruned
+
+    def documents(self, owner=None):
+        return self.registry.documents(owner)
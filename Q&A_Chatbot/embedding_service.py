@@ -0,0 +1,133 @@
+"""Batched sentence-transformers embeddings with a persistent vector cache.
+
+Chunk vectors are cached in SQLite under sha256(model name, text), so
+re-processing an unchanged document, or a new document that shares chunks with
+an old one, only encodes the chunks that were never seen before. Misses are
+encoded in configurable batches, and large batches can be spread over several
+CPU processes with sentence-transformers' multi-process pool.
+"""
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+from functools import lru_cache
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBED_MODEL = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+ENCODE_BATCH_SIZE = int(os.getenv("ENCODE_BATCH_SIZE", 64))
+# Worker processes for encoding; 1 keeps encoding in-process
+EMBED_PROCESSES = int(os.getenv("EMBED_PROCESSES", 1))
+# Below this many uncached texts the multi-process pool is not worth its overhead
+MULTI_PROCESS_MIN_TEXTS = 256
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", ".embedding_cache.sqlite3")
+SQLITE_MAX_VARIABLES = 500
+
+
+def content_hash(model_name, text):
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite map of content hash -> float32 vector, safe to share across threads."""
+
+    def __init__(self, path=EMBED_CACHE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, hashes):
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for i in range(0, len(unique), SQLITE_MAX_VARIABLES):
+                part = unique[i:i + SQLITE_MAX_VARIABLES]
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE hash IN ({','.join('?' * len(part))})", part
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (hash, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items],
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain ``Embeddings`` that only encodes texts missing from the cache."""
+
+    def __init__(self, model_name=EMBED_MODEL, batch_size=ENCODE_BATCH_SIZE, processes=EMBED_PROCESSES,
+                 cache=None, normalize=True):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.processes = processes
+        self.normalize = normalize
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self.embed_query = lru_cache(maxsize=1024)(self.embed_query)
+
+    def _encode(self, texts):
+        if self.processes > 1 and len(texts) >= MULTI_PROCESS_MIN_TEXTS:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+                    atexit.register(self.close)
+            vectors = self.model.encode_multi_process(texts, self._pool, batch_size=self.batch_size)
+        else:
+            vectors = self.model.encode(texts, batch_size=self.batch_size, show_progress_bar=False,
+                                        convert_to_numpy=True)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.normalize:
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        hashes = [content_hash(self.model_name, text) for text in texts]
+        vectors = self.cache.get_many(hashes)
+
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        if missing:
+            encoded = self._encode(list(missing.values()))
+            new = dict(zip(missing.keys(), encoded))
+            self.cache.put_many(new.items())
+            vectors.update(new)
+        return [vectors[key].tolist() for key in hashes]
+
+    def embed_query(self, text):
+        return self._encode([text])[0].tolist()
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self.model.stop_multi_process_pool(self._pool)
+                self._pool = None
@@ -0,0 +1,271 @@
+"""Hybrid sparse + dense retrieval with optional cross-encoder reranking.
+
+A BM25 index is kept per document namespace next to the vector store and
+updated by ``DocumentIndex`` during ingestion. At query time the dense
+(embedding) and sparse (BM25) candidate lists are merged with reciprocal rank
+fusion, so exact-term matches such as part numbers, clause IDs and names
+surface even when their embeddings are not close to the question. The fused
+top-N can then be reordered by a cross-encoder before the top ``k`` go to the
+LLM.
+"""
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, List
+
+import numpy as np
+from langchain.schema import BaseRetriever, Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+
+from document_index import chunk_id
+
+BM25_INDEX_DIR = os.getenv("BM25_INDEX_DIR", ".bm25_index")
+# Empty disables reranking, e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2" enables it
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "")
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+
+# Keeps identifiers like "A-113.2" or "sec_4" together and also indexes their parts
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+
+def tokenize(text):
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        tokens.append(token)
+        parts = re.split(r"[-_./]", token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part)
+    return tokens
+
+
+# ---------------------------------------------------------------------------
+# SPARSE INDEX
+# ---------------------------------------------------------------------------
+
+
+class BM25Index:
+    """Okapi BM25 over one namespace's chunks; term statistics are rebuilt lazily after writes.
+
+    Adding an id that already exists replaces its text and metadata.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.texts = []
+        self.metadatas = []
+        self._row_of = {}
+        self._dirty = True
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, ids, texts, metadatas):
+        for id_, text, metadata in zip(ids, texts, metadatas):
+            row = self._row_of.get(id_)
+            if row is None:
+                self._row_of[id_] = len(self.ids)
+                self.ids.append(id_)
+                self.texts.append(text)
+                self.metadatas.append(dict(metadata))
+            else:
+                self.texts[row] = text
+                self.metadatas[row] = dict(metadata)
+        self._dirty = True
+
+    def delete(self, ids):
+        drop = set(ids)
+        keep = [i for i, id_ in enumerate(self.ids) if id_ not in drop]
+        self.ids = [self.ids[i] for i in keep]
+        self.texts = [self.texts[i] for i in keep]
+        self.metadatas = [self.metadatas[i] for i in keep]
+        self._row_of = {id_: row for row, id_ in enumerate(self.ids)}
+        self._dirty = True
+
+    def _build(self):
+        self._postings = {}
+        lengths = np.zeros(len(self.ids), dtype=np.float32)
+        for row, text in enumerate(self.texts):
+            counts = Counter(tokenize(text))
+            lengths[row] = sum(counts.values())
+            for term, tf in counts.items():
+                self._postings.setdefault(term, []).append((row, tf))
+        n = len(self.ids)
+        self._idf = {term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self._postings.items()}
+        avgdl = float(lengths.mean()) if n else 0.0
+        self._norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(avgdl, 1e-9))
+        self._dirty = False
+
+    def search(self, query, k):
+        """``(row, score)`` pairs for the ``k`` best-scoring chunks with any query term."""
+        if not self.ids:
+            return []
+        if self._dirty:
+            self._build()
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            for row, tf in self._postings.get(term, ()):
+                scores[row] += self._idf[term] * tf * (BM25_K1 + 1) / (tf + self._norm[row])
+        hits = np.flatnonzero(scores)
+        top = hits[np.argsort(-scores[hits])][:k]
+        return [(int(row), float(scores[row])) for row in top]
+
+    def document(self, row):
+        return Document(page_content=self.texts[row], metadata=dict(self.metadatas[row], id=self.ids[row]))
+
+
+class SparseIndex:
+    """Per-namespace BM25 indexes persisted as one JSONL file each.
+
+    Each write rewrites its namespace's file unless it happens inside
+    ``batch_writes()``, which saves every namespace it touched once on exit.
+    """
+
+    def __init__(self, directory=BM25_INDEX_DIR):
+        self.directory = directory
+        self._indexes = {}
+        self._lock = threading.RLock()
+        self._batch = threading.local()
+
+    def _path(self, namespace):
+        return os.path.join(self.directory, f"{namespace}.jsonl")
+
+    def _get(self, namespace):
+        index = self._indexes.get(namespace)
+        if index is None:
+            index = BM25Index()
+            path = self._path(namespace)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    records = [json.loads(line) for line in f]
+                index.add([r["id"] for r in records], [r["text"] for r in records],
+                          [r["metadata"] for r in records])
+            self._indexes[namespace] = index
+        return index
+
+    def _save(self, namespace, index):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".jsonl")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for id_, text, metadata in zip(index.ids, index.texts, index.metadatas):
+                f.write(json.dumps({"id": id_, "text": text, "metadata": metadata}) + "\n")
+        os.replace(tmp, self._path(namespace))
+
+    @contextmanager
+    def batch_writes(self):
+        """Defer saving on this thread until the outermost block exits."""
+        if getattr(self._batch, "depth", 0) == 0:
+            self._batch.dirty = set()
+        self._batch.depth = getattr(self._batch, "depth", 0) + 1
+        try:
+            yield self
+        finally:
+            self._batch.depth -= 1
+            if self._batch.depth == 0:
+                with self._lock:
+                    for namespace in self._batch.dirty:
+                        # Dropped namespaces have no index left to save
+                        if namespace in self._indexes:
+                            self._save(namespace, self._indexes[namespace])
+
+    def _written(self, namespace, index):
+        if getattr(self._batch, "depth", 0):
+            self._batch.dirty.add(namespace)
+        else:
+            self._save(namespace, index)
+
+    def ids(self, namespace):
+        with self._lock:
+            return set(self._get(namespace).ids)
+
+    def add(self, namespace, ids, texts, metadatas):
+        with self._lock:
+            index = self._get(namespace)
+            index.add(ids, texts, metadatas)
+            self._written(namespace, index)
+
+    def delete(self, namespace, ids):
+        with self._lock:
+            index = self._get(namespace)
+            index.delete(ids)
+            self._written(namespace, index)
+
+    def drop(self, namespace):
+        with self._lock:
+            self._indexes.pop(namespace, None)
+            if os.path.exists(self._path(namespace)):
+                os.remove(self._path(namespace))
+
+    def search(self, namespace, query, k):
+        with self._lock:
+            index = self._get(namespace)
+            return [(index.document(row), score) for row, score in index.search(query, k)]
+
+
+# ---------------------------------------------------------------------------
+# RERANKING AND FUSION
+# ---------------------------------------------------------------------------
+
+
+class CrossEncoderReranker:
+    """Scores (question, chunk) pairs jointly with a sentence-transformers cross-encoder."""
+
+    def __init__(self, model_name=RERANKER_MODEL, batch_size=32):
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name, device="cpu")
+        self.batch_size = batch_size
+
+    def rerank(self, query, documents, k):
+        if not documents:
+            return []
+        scores = self.model.predict([(query, doc.page_content) for doc in documents], batch_size=self.batch_size)
+        order = np.argsort(-np.asarray(scores))[:k]
+        return [documents[i] for i in order]
+
+
+def reciprocal_rank_fusion(result_lists, key, rrf_k=RRF_K):
+    """Merge ranked lists; each item scores ``sum(1 / (rrf_k + rank))`` over the lists it appears in."""
+    scores = {}
+    items = {}
+    for results in result_lists:
+        for rank, item in enumerate(results):
+            item_key = key(item)
+            scores[item_key] = scores.get(item_key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            items.setdefault(item_key, item)
+    return [items[item_key] for item_key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense + BM25 retrieval over one or more namespaces fused with RRF, optionally reranked."""
+
+    vectorstore: Any
+    sparse: Any
+    namespaces: List[str]
+    k: int = 5
+    fetch_k: int = 20
+    reranker: Any = None
+    rerank_top_n: int = 20
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        ranked_lists = []
+        for namespace in self.namespaces:
+            dense = self.vectorstore.similarity_search(query, k=self.fetch_k, namespace=namespace)
+            sparse = [doc for doc, _ in self.sparse.search(namespace, query, self.fetch_k)]
+            ranked_lists += [[(namespace, doc) for doc in dense], [(namespace, doc) for doc in sparse]]
+        # Chunk IDs are content hashes, so the same chunk from either side shares a key
+        fused = [doc for _, doc in reciprocal_rank_fusion(
+            ranked_lists, key=lambda item: chunk_id(item[0], item[1].page_content)
+        )]
+        if self.reranker is not None:
+            return self.reranker.rerank(query, fused[:self.rerank_top_n], self.k)
+        return fused[:self.k]
@@ -0,0 +1,99 @@
+"""Background PDF ingestion jobs shared by all Streamlit sessions.
+
+Uploads are written to a temporary file only when a job is submitted, parsed
+and indexed on a bounded thread pool off the request thread, and the file is
+removed as soon as the job ends, whatever the outcome. Each session keeps
+the ids of its own jobs and polls them for progress; finished jobs are
+forgotten after ``JOB_RETENTION_SECONDS``.
+"""
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from pdf_ingest import iter_pdf_chunks, page_count
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 2))
+JOB_RETENTION_SECONDS = 60 * 60
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class IngestionJob:
+    def __init__(self, name, owner=None):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.owner = owner
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "Waiting to start"
+        self.namespace = None
+        self.stats = None
+        self.error = None
+        self.finished_at = None
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+
+class IngestionQueue:
+    """Runs ``DocumentIndex.upsert_document`` for uploaded PDFs on worker threads."""
+
+    def __init__(self, document_index, workers=INGEST_WORKERS, batch_size=64):
+        self.document_index = document_index
+        self.batch_size = batch_size
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name, data, owner=None):
+        """Queue the PDF bytes ``data`` for indexing as ``owner``'s document ``name``."""
+        job = IngestionJob(name, owner)
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, path)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def _run(self, job, path):
+        job.status = RUNNING
+        try:
+            total_pages = page_count(path)
+            job.message = f"Processing 0/{total_pages} pages"
+
+            def update_progress(chunk):
+                page = chunk.metadata["page"]
+                job.progress = page / total_pages
+                job.message = f"Processing {page}/{total_pages} pages"
+
+            # Only new or changed chunks are embedded; removed ones are deleted
+            docs = iter_pdf_chunks(path, source=job.name, total_pages=total_pages)
+            job.namespace, job.stats = self.document_index.upsert_document(
+                job.name, docs, owner=job.owner, batch_size=self.batch_size, on_progress=update_progress
+            )
+            job.progress = 1.0
+            job.message = (f"{job.stats['added']} new, {job.stats['updated']} moved, "
+                           f"{job.stats['unchanged']} unchanged, {job.stats['removed']} removed chunks")
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.message = f"Error processing document: {e}"
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            os.unlink(path)
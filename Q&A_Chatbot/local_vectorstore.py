@@ -0,0 +1,465 @@
+"""In-process vector store for running the chatbot without Pinecone.
+
+Vectors are L2-normalized float32 rows in ``vectors.npy`` (memory-mapped on
+load) with the chunk texts/metadata in ``docs.jsonl``. Search is exact
+NumPy cosine similarity for small corpora; once a store grows past
+``APPROX_THRESHOLD`` vectors an approximate index is built: HNSW when
+``hnswlib`` is installed, otherwise a NumPy IVF (inverted file) index.
+
+Every write saves the store unless it happens inside ``batch_writes()``, in
+which case new vectors are buffered, the approximate index is extended and
+the files are rewritten once when the block exits (``DocumentIndex`` wraps
+each document upsert in one).
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+APPROX_THRESHOLD = int(os.getenv("LOCAL_INDEX_APPROX_THRESHOLD", 50_000))
+IVF_NPROBE = 8
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _atomic_save(path: str, array: np.ndarray) -> None:
+    # Write beside the target and rename, so readers holding a memory map of
+    # the old file keep a valid mapping.
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".npy")
+    with os.fdopen(fd, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------------
+# APPROXIMATE INDEXES
+# ---------------------------------------------------------------------------
+
+
+class _IVFIndex:
+    """Spherical k-means coarse quantizer; searches the ``nprobe`` closest lists exactly."""
+
+    name = "ivf"
+
+    def __init__(self, centroids: np.ndarray, assignments: np.ndarray):
+        self.centroids = centroids
+        self.assignments = assignments
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, iterations: int = 10) -> "_IVFIndex":
+        rng = np.random.default_rng(0)
+        nlist = max(1, int(np.sqrt(len(vectors))))
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), nlist * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+        return cls(centroids, cls._assign(centroids, vectors))
+
+    @staticmethod
+    def _assign(centroids: np.ndarray, vectors: np.ndarray, batch: int = 8192) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(vectors[i:i + batch] @ centroids.T, axis=1)
+            for i in range(0, len(vectors), batch)
+        ]) if len(vectors) else np.empty(0, dtype=np.int64)
+
+    def add(self, vectors: np.ndarray) -> None:
+        self.assignments = np.concatenate([self.assignments, self._assign(self.centroids, vectors)])
+
+    def search(self, vectors: np.ndarray, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        probes = np.argsort(-(self.centroids @ query))[:IVF_NPROBE]
+        candidates = np.flatnonzero(np.isin(self.assignments, probes))
+        scores = vectors[candidates] @ query
+        top = np.argsort(-scores)[:k]
+        return candidates[top], scores[top]
+
+    def save(self, directory: str) -> None:
+        _atomic_save(os.path.join(directory, "ivf_centroids.npy"), self.centroids)
+        _atomic_save(os.path.join(directory, "ivf_assignments.npy"), self.assignments)
+
+    @classmethod
+    def load(cls, directory: str) -> "_IVFIndex":
+        return cls(np.load(os.path.join(directory, "ivf_centroids.npy")),
+                   np.load(os.path.join(directory, "ivf_assignments.npy")))
+
+
+class _HNSWIndex:
+    """Thin wrapper around ``hnswlib`` using inner product on normalized vectors."""
+
+    name = "hnsw"
+
+    def __init__(self, index):
+        self.index = index
+
+    @classmethod
+    def build(cls, vectors: np.ndarray) -> "_HNSWIndex":
+        index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        index.init_index(max_elements=len(vectors) * 2, ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M)
+        index.add_items(vectors, np.arange(len(vectors)))
+        return cls(index)
+
+    def add(self, vectors: np.ndarray) -> None:
+        start = self.index.get_current_count()
+        if start + len(vectors) > self.index.get_max_elements():
+            self.index.resize_index((start + len(vectors)) * 2)
+        self.index.add_items(vectors, np.arange(start, start + len(vectors)))
+
+    def search(self, vectors: np.ndarray, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, self.index.get_current_count())
+        self.index.set_ef(max(k * 2, 64))
+        labels, distances = self.index.knn_query(query, k=k)
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+    def save(self, directory: str) -> None:
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".bin")
+        os.close(fd)
+        self.index.save_index(tmp)
+        os.replace(tmp, os.path.join(directory, "hnsw.bin"))
+
+    @classmethod
+    def load(cls, directory: str, dim: int, count: int) -> "_HNSWIndex":
+        index = hnswlib.Index(space="ip", dim=dim)
+        index.load_index(os.path.join(directory, "hnsw.bin"), max_elements=count * 2)
+        return cls(index)
+
+
+# ---------------------------------------------------------------------------
+# VECTOR STORE
+# ---------------------------------------------------------------------------
+
+
+class LocalVectorStore(VectorStore):
+    """LangChain ``VectorStore`` backed by NumPy arrays on local disk.
+
+    Rows can be grouped into namespaces (stored as ``metadata["namespace"]``);
+    every search method accepts ``namespace=`` to restrict results to one.
+    Adding an id that already exists updates its metadata in place.
+    """
+
+    def __init__(self, embedding: Embeddings, persist_directory: Optional[str] = None,
+                 approx_threshold: int = APPROX_THRESHOLD):
+        self.embedding = embedding
+        self.persist_directory = persist_directory
+        self.approx_threshold = approx_threshold
+        self._lock = threading.RLock()
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        # Normalized rows appended since ``_vectors`` was last materialized
+        self._pending: List[np.ndarray] = []
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[dict] = []
+        self._ann = None
+        # Rows [0, _indexed) are in the approximate index; later rows are scanned exactly
+        self._indexed = 0
+        self._row_of: Dict[str, int] = {}
+        self._namespace_rows: Dict[Optional[str], List[int]] = {}
+        self._batch = threading.local()
+        if persist_directory and os.path.exists(os.path.join(persist_directory, "docs.jsonl")):
+            self._load()
+        self._reindex()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _reindex(self, start: int = 0) -> None:
+        """Index rows from ``start`` on by id and namespace (``start=0`` rebuilds from scratch)."""
+        if start == 0:
+            self._row_of, self._namespace_rows = {}, {}
+        for row in range(start, len(self._ids)):
+            self._row_of[self._ids[row]] = row
+            self._namespace_rows.setdefault(self._metadatas[row].get("namespace"), []).append(row)
+
+    def _matrix(self) -> np.ndarray:
+        """Every vector as one array, folding in rows buffered since the last call."""
+        if self._pending:
+            parts = [np.asarray(self._vectors)] if len(self._vectors) else []
+            self._vectors = np.concatenate(parts + self._pending)
+            self._pending = []
+        return self._vectors
+
+    def namespaces(self) -> Dict[Optional[str], int]:
+        """Row count per namespace."""
+        with self._lock:
+            return {ns: len(rows) for ns, rows in self._namespace_rows.items()}
+
+    def namespace_ids(self, namespace: Optional[str]) -> List[str]:
+        with self._lock:
+            return [self._ids[row] for row in self._namespace_rows.get(namespace, [])]
+
+    # -- persistence --------------------------------------------------------
+
+    def _load(self) -> None:
+        directory = self.persist_directory
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self._vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(directory, "docs.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                self._ids.append(record["id"])
+                self._texts.append(record["text"])
+                self._metadatas.append(record["metadata"])
+        if meta.get("index") == "hnsw" and hnswlib is not None:
+            self._ann = _HNSWIndex.load(directory, self._vectors.shape[1], len(self._ids))
+        elif meta.get("index") == "ivf":
+            self._ann = _IVFIndex.load(directory)
+        self._indexed = len(self._ids) if self._ann is not None else 0
+
+    def save(self) -> None:
+        """Write vectors, documents and any approximate index to ``persist_directory``."""
+        if not self.persist_directory:
+            return
+        with self._lock:
+            directory = self.persist_directory
+            os.makedirs(directory, exist_ok=True)
+            self._sync_ann()
+            _atomic_save(os.path.join(directory, "vectors.npy"), np.ascontiguousarray(self._matrix()))
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".jsonl")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for id_, text, metadata in zip(self._ids, self._texts, self._metadatas):
+                    f.write(json.dumps({"id": id_, "text": text, "metadata": metadata}) + "\n")
+            os.replace(tmp, os.path.join(directory, "docs.jsonl"))
+            if self._ann is not None:
+                self._ann.save(directory)
+            else:
+                for name in ("hnsw.bin", "ivf_centroids.npy", "ivf_assignments.npy"):
+                    path = os.path.join(directory, name)
+                    if os.path.exists(path):
+                        os.remove(path)
+            with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"count": len(self._ids), "dim": int(self._vectors.shape[1]) if len(self._ids) else 0,
+                           "index": self._ann.name if self._ann else "exact"}, f)
+            # Re-open the file we just wrote as a memory map instead of holding a second copy
+            self._vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+
+    # -- writes -------------------------------------------------------------
+
+    @contextmanager
+    def batch_writes(self):
+        """Defer approximate-index updates and saving on this thread until the block exits."""
+        self._batch.depth = getattr(self._batch, "depth", 0) + 1
+        try:
+            yield self
+        finally:
+            self._batch.depth -= 1
+            self._written()
+
+    def _written(self) -> None:
+        if not getattr(self._batch, "depth", 0):
+            self._sync_ann()
+            self.save()
+
+    def _sync_ann(self) -> None:
+        """Extend the approximate index with unindexed rows, building it once past the threshold."""
+        with self._lock:
+            if self._ann is not None and self._indexed < len(self._ids):
+                self._ann.add(np.asarray(self._matrix()[self._indexed:]))
+            elif self._ann is None and len(self._ids) >= self.approx_threshold:
+                self._build_ann()
+            self._indexed = len(self._ids) if self._ann is not None else 0
+
+    def add_embeddings(self, texts: List[str], embeddings: List[List[float]],
+                       metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None,
+                       namespace: Optional[str] = None) -> List[str]:
+        metadatas = [dict(m) for m in metadatas] if metadatas else [{} for _ in texts]
+        if namespace is not None:
+            for metadata in metadatas:
+                metadata["namespace"] = namespace
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        with self._lock:
+            new_rows = []
+            moved = False
+            for i, id_ in enumerate(ids):
+                row = self._row_of.get(id_)
+                if row is None:
+                    new_rows.append(i)
+                else:
+                    moved |= self._metadatas[row].get("namespace") != metadatas[i].get("namespace")
+                    self._texts[row] = texts[i]
+                    self._metadatas[row] = metadatas[i]
+            start = len(self._ids)
+            if new_rows:
+                self._pending.append(_normalize([embeddings[i] for i in new_rows]))
+                self._ids.extend(ids[i] for i in new_rows)
+                self._texts.extend(texts[i] for i in new_rows)
+                self._metadatas.extend(metadatas[i] for i in new_rows)
+            self._reindex(0 if moved else start)
+            self._written()
+        return ids
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, namespace: Optional[str] = None,
+                  **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.add_embeddings(texts, self.embedding.embed_documents(texts), metadatas, ids, namespace)
+
+    def delete(self, ids: Optional[List[str]] = None, namespace: Optional[str] = None,
+               **kwargs: Any) -> Optional[bool]:
+        """Delete rows by id, or every row in ``namespace`` when no ids are given."""
+        with self._lock:
+            if ids is None and namespace is not None:
+                ids = self.namespace_ids(namespace)
+            if not ids:
+                return False
+            drop = set(ids)
+            keep = [i for i, id_ in enumerate(self._ids) if id_ not in drop]
+            if len(keep) == len(self._ids):
+                return False
+            self._vectors = np.asarray(self._matrix())[keep] if keep else np.empty((0, 0), dtype=np.float32)
+            self._ids = [self._ids[i] for i in keep]
+            self._texts = [self._texts[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+            indexed = [i for i in keep if i < self._indexed]
+            if isinstance(self._ann, _IVFIndex) and indexed:
+                # IVF lists are row-aligned, so they can be filtered without retraining
+                self._ann.assignments = self._ann.assignments[indexed]
+                self._indexed = len(indexed)
+            else:
+                # Rebuilt by _sync_ann, immediately or when the batch ends
+                self._ann, self._indexed = None, 0
+            self._reindex()
+            self._written()
+        return True
+
+    def _build_ann(self) -> None:
+        vectors = np.asarray(self._matrix())
+        self._ann = _HNSWIndex.build(vectors) if hnswlib is not None else _IVFIndex.build(vectors)
+        self._indexed = len(vectors)
+
+    # -- search -------------------------------------------------------------
+
+    def _exact(self, query: np.ndarray, k: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        vectors = self._matrix()
+        scores = (vectors if rows is None else vectors[rows]) @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return (top if rows is None else rows[top]), scores[top]
+
+    def _search(self, query: np.ndarray, k: int, namespace: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        rows = None
+        if namespace is not None:
+            if namespace not in self._namespace_rows:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            rows = np.asarray(self._namespace_rows[namespace], dtype=np.int64)
+        if not len(self._ids):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        # Small namespaces are cheaper to scan exactly than to filter approximate results
+        if self._ann is None or (rows is not None and len(rows) < self.approx_threshold):
+            return self._exact(query, k, rows)
+        if rows is None:
+            return self._ann_search(query, k)
+        indices, scores = self._ann_search(query, k * 4)
+        mask = np.isin(indices, rows)
+        if mask.sum() < k:
+            return self._exact(query, k, rows)
+        return indices[mask][:k], scores[mask][:k]
+
+    def _ann_search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        indices, scores = self._ann.search(self._matrix(), query, k)
+        if self._indexed < len(self._ids):
+            # Rows written during an unfinished batch are not in the index yet
+            tail = self._exact(query, k, np.arange(self._indexed, len(self._ids)))
+            indices, scores = np.concatenate([indices, tail[0]]), np.concatenate([scores, tail[1]])
+            top = np.argsort(-scores)[:k]
+            indices, scores = indices[top], scores[top]
+        return indices, scores
+
+    def _document(self, index: int) -> Document:
+        return Document(page_content=self._texts[index], metadata=dict(self._metadatas[index], id=self._ids[index]))
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               namespace: Optional[str] = None) -> List[Tuple[Document, float]]:
+        with self._lock:
+            indices, scores = self._search(_normalize(embedding), k, namespace)
+            return [(self._document(i), float(s)) for i, s in zip(indices, scores)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, namespace: Optional[str] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k, namespace)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, namespace: Optional[str] = None,
+                                    **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, namespace)]
+
+    def similarity_search(self, query: str, k: int = 4, namespace: Optional[str] = None,
+                          **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, namespace)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are cosine similarities in [-1, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5, namespace: Optional[str] = None,
+                                                **kwargs: Any) -> List[Document]:
+        query = _normalize(embedding)
+        with self._lock:
+            indices, _ = self._search(query, fetch_k, namespace)
+            if not len(indices):
+                return []
+            candidates = np.asarray(self._matrix()[indices])
+            selected = maximal_marginal_relevance(query, candidates, lambda_mult=lambda_mult, k=k)
+            return [self._document(int(indices[i])) for i in selected]
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20,
+                                      lambda_mult: float = 0.5, namespace: Optional[str] = None,
+                                      **kwargs: Any) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self.embedding.embed_query(query), k, fetch_k, lambda_mult, namespace
+        )
+
+    # -- constructors -------------------------------------------------------
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, persist_directory: Optional[str] = None,
+                   namespace: Optional[str] = None, **kwargs: Any) -> "LocalVectorStore":
+        """Open (or create) the store at ``persist_directory`` and add ``texts`` to it."""
+        store = cls(embedding, persist_directory=persist_directory, **kwargs)
+        store.add_texts(texts, metadatas, ids, namespace=namespace)
+        return store
+
+    def clear(self) -> None:
+        """Remove every vector and the on-disk files."""
+        with self._lock:
+            self._vectors = np.empty((0, 0), dtype=np.float32)
+            self._pending = []
+            self._ids, self._texts, self._metadatas = [], [], []
+            self._ann, self._indexed = None, 0
+            self._reindex()
+            if self.persist_directory and os.path.isdir(self.persist_directory):
+                shutil.rmtree(self.persist_directory)
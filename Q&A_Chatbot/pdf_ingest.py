@@ -0,0 +1,121 @@
+"""Streaming, page-parallel PDF ingestion.
+
+Pages are extracted with pdfplumber in a process pool, a batch of pages per
+task, and split into chunks that keep their page number. Chunks are yielded
+in page order as soon as their batch is ready, so callers can embed early
+pages while later ones are still being parsed and the full text of the
+document is never held in memory at once.
+
+The pool is created once per process and shared by every document. Its
+workers are spawned rather than forked, because ingestion runs on threads
+of the multi-threaded Streamlit server.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+
+import pdfplumber
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 8))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+def page_count(file_path):
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def _extract_pages(file_path, start, end):
+    # Runs in a worker process: returns (1-based page number, text) for pages [start, end)
+    pages = []
+    with pdfplumber.open(file_path) as pdf:
+        for index in range(start, end):
+            page = pdf.pages[index]
+            text = page.extract_text()
+            if text:
+                pages.append((index + 1, text))
+            page.flush_cache()
+    return pages
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pools[workers] = pool
+        return pool
+
+
+def _discard_pool(workers, pool):
+    # A worker that died (e.g. on a malformed PDF) breaks the pool; the next document gets a new one
+    with _pools_lock:
+        if _pools.get(workers) is pool:
+            del _pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def _shutdown_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
+
+
+def _iter_page_batches(file_path, total_pages, workers, pages_per_task):
+    ranges = [(start, min(start + pages_per_task, total_pages))
+              for start in range(0, total_pages, pages_per_task)]
+    if workers <= 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            yield _extract_pages(file_path, start, end)
+        return
+
+    # Keep a bounded window of batches in flight so memory stays flat on long PDFs
+    pool = _get_pool(workers)
+    pending = deque()
+    try:
+        for start, end in ranges:
+            pending.append(pool.submit(_extract_pages, file_path, start, end))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    except BrokenProcessPool:
+        _discard_pool(workers, pool)
+        raise
+    finally:
+        # A job that stops early (error or closed generator) must not leave its pages queued
+        for future in pending:
+            future.cancel()
+
+
+def iter_pdf_chunks(file_path, source=None, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP,
+                    workers=PDF_WORKERS, pages_per_task=PAGES_PER_TASK, total_pages=None):
+    """Yield chunk ``Document``s in page order with ``page``, ``chunk`` and ``source`` metadata."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    source = source or os.path.basename(file_path)
+    if total_pages is None:
+        total_pages = page_count(file_path)
+    chunk_index = 0
+    for batch in _iter_page_batches(file_path, total_pages, workers, pages_per_task):
+        for page_number, text in batch:
+            for chunk in splitter.split_text(text):
+                yield Document(
+                    page_content=chunk,
+                    metadata={"source": source, "page": page_number, "chunk": chunk_index},
+                )
+                chunk_index += 1
+
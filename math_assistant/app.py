@@ -6,35 +6,38 @@ from PIL import Image
 
 # LangChain & SymPy Tools
 from langchain.agents import initialize_agent, AgentType
-from sympy_tools import sympy_derivative_tool, sympy_integral_tool
-from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
+from sympy_tools import (
+    sympy_derivative_tool, sympy_integral_tool, sympy_limit_tool, sympy_simplify_tool, sympy_solve_tool
+)
+from intent_parser import parse_intent, run_intent
 from langchain_groq import ChatGroq
-
-# LaTeX-OCR (pix2tex)
-from pix2tex.cli import LatexOCR
+from hf_backend import HF_MODEL_ID, HF_PRECISION, HFGenerator, HFLLM
+from batch_ocr import BatchOCR
 
 # --- Load environment variables ---
 load_dotenv()
 hf_token = os.getenv("HF_TOKEN")
 groq_api_key = os.getenv("GROQ_API_KEY")
 
-# --- Initialize LaTeX-OCR model ---
-ocr_model = LatexOCR()
+# --- LaTeX-OCR model, loaded once per process on first use ---
+@st.cache_resource(show_spinner="Loading LaTeX-OCR model...")
+def get_ocr_model():
+    from pix2tex.cli import LatexOCR
+
+    return LatexOCR()
 
-def extract_latex_from_image(image):
-    return ocr_model(image)
+@st.cache_resource
+def get_batch_ocr():
+    return BatchOCR(model=get_ocr_model())
 
-# --- Hugging Face model wrapper ---
-class HFLLM:
-    def __init__(self):
-        model_id = "deepseek-ai/deepseek-llm-7b-base"
-        self.tokenizer = AutoTokenizer.from_pretrained(model_id, token=hf_token)
-        self.model = AutoModelForCausalLM.from_pretrained(model_id, token=hf_token)
-        self.pipe = pipeline("text-generation", model=self.model, tokenizer=self.tokenizer, max_new_tokens=200)
+# --- LLM backends, shared across sessions and reruns ---
+@st.cache_resource
+def get_groq_llm():
+    return ChatGroq(temperature=0, model_name="llama3-8b-8192")
 
-    def __call__(self, prompt, stop=None):
-        result = self.pipe(prompt)[0]['generated_text']
-        return result[len(prompt):]
+@st.cache_resource(show_spinner="Loading DeepSeek 7B weights (first use only)...")
+def get_hf_llm(model_id=HF_MODEL_ID, precision=HF_PRECISION):
+    return HFLLM(generator=HFGenerator(model_id, precision, token=hf_token))
 
 # --- Streamlit UI ---
 st.title("🧠 Math Assistant with LLaMA3 + LaTeX-OCR")
@@ -43,14 +46,14 @@ model_option = st.radio("Choose Model Backend", ["Groq (LLaMA3 8B)", "HuggingFac
 
 # LLM initialization
 if model_option == "Groq (LLaMA3 8B)":
-    llm = ChatGroq(temperature=0, model_name="llama3-8b-8192")
+    llm = get_groq_llm()
     st.success("✅ Using LLaMA3 8B via Groq")
 else:
-    llm = HFLLM()
+    llm = get_hf_llm()
     st.success("✅ Using DeepSeek 7B via Hugging Face")
 
 # LangChain Agent setup
-tools = [sympy_derivative_tool, sympy_integral_tool]
+tools = [sympy_derivative_tool, sympy_integral_tool, sympy_simplify_tool, sympy_solve_tool, sympy_limit_tool]
 agent = initialize_agent(
     tools=tools,
     llm=llm,
@@ -66,20 +69,56 @@ query = ""
 if query_mode == "Text":
     query = st.text_input("🔢 Enter a math expression (e.g., 'differentiate sin(x)*x^2')")
 else:
-    uploaded_image = st.file_uploader("📤 Upload a math image", type=["jpg", "jpeg", "png"])
-    if uploaded_image:
-        image = Image.open(uploaded_image)
-        st.image(image, caption="🖼 Uploaded Image", use_column_width=True)
-        try:
-            with st.spinner("🤖 Running LaTeX-OCR..."):
-                query = extract_latex_from_image(image)
-            st.info(f"🧾 Extracted LaTeX: `{query.strip()}`")
-            st.latex(query.strip())
-        except Exception as e:
-            st.error(f"❌ OCR failed: {str(e)}")
+    uploaded_images = st.file_uploader(
+        "📤 Upload math images", type=["jpg", "jpeg", "png"], accept_multiple_files=True
+    )
+    if uploaded_images:
+        progress = st.progress(0.0, text="🤖 Running LaTeX-OCR...")
+        done = []
 
-# Run Agent
+        def update_progress(result):
+            done.append(result)
+            progress.progress(len(done) / len(uploaded_images),
+                              text=f"🤖 Running LaTeX-OCR... {len(done)}/{len(uploaded_images)}")
+
+        results = get_batch_ocr().run([(f.name, f.getvalue()) for f in uploaded_images], on_result=update_progress)
+        progress.empty()
+        for uploaded_image, result in zip(uploaded_images, results):
+            with st.expander(f"🖼 {result['name']}", expanded=len(uploaded_images) == 1):
+                st.image(Image.open(uploaded_image), use_column_width=True)
+                if result["error"]:
+                    st.error(f"❌ OCR failed: {result['error']}")
+                else:
+                    st.info(f"🧾 Extracted LaTeX: `{result['latex'].strip()}`")
+                    st.latex(result["latex"].strip())
+
+        recognized = [result for result in results if result["latex"]]
+        if len(recognized) == 1:
+            query = recognized[0]["latex"]
+        elif recognized:
+            choice = st.selectbox("🧮 Expression to solve", range(len(recognized)),
+                                  format_func=lambda i: f"{recognized[i]['name']}: {recognized[i]['latex'].strip()}")
+            query = recognized[choice]["latex"]
+
+# Recognizable commands are answered by SymPy directly; everything else goes to the agent
+direct_result = None
 if query.strip():
+    try:
+        intent = parse_intent(query)
+        direct_result = run_intent(intent) if intent is not None else None
+    except Exception:
+        direct_result = None
+    if direct_result is not None and "error" in direct_result:
+        direct_result = None
+
+if direct_result is not None:
+    st.success(f"⚡ Solved directly with SymPy ({intent['operation']})")
+    answer = next(value for key, value in direct_result.items() if key not in ("latex", "method"))
+    st.markdown(f"**Response:** `{answer}`")
+    st.latex(direct_result["latex"])
+    if direct_result.get("method") == "numeric":
+        st.caption("Evaluated numerically: no closed form was found within the time limit.")
+elif query.strip():
     with st.spinner("🧠 Solving..."):
         try:
             answer = agent.run(query)
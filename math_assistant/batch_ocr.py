@@ -0,0 +1,223 @@
+"""Batch LaTeX-OCR over many images with a persistent result cache.
+
+Images are cleaned up before recognition: orientation is fixed from EXIF,
+transparency is flattened onto white, very large photos are downscaled and
+the image is cropped to its ink, so the formula fills pix2tex's input. Each
+image is looked up in a SQLite cache under the sha256 of its bytes, and only
+misses (each distinct image once) go to a bounded thread or process pool.
+
+pix2tex's ``LatexOCR`` recognizes one image per call and is not documented as
+thread-safe, so images are not stacked into one tensor batch. With threads,
+decoding and preprocessing overlap while calls into the shared model are
+serialized; for parallel inference use processes, each with its own model.
+Images are read from the input iterable only as pool slots free up.
+
+Run headless over a directory of worksheet images::
+
+    python batch_ocr.py worksheets/ --output results.jsonl --processes
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from PIL import Image, ImageOps
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", 2))
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", ".ocr_cache.sqlite3")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+MAX_IMAGE_SIDE = 1600
+CROP_PADDING = 8
+# Pixels darker than this (after autocontrast) count as ink when cropping
+INK_THRESHOLD = 200
+SQLITE_MAX_VARIABLES = 500
+
+
+def image_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def preprocess_image(image):
+    """Normalize an uploaded or scanned image for pix2tex."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.split()[-1])
+        image = background
+    image = image.convert("RGB")
+    image.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+    ink = ImageOps.autocontrast(image.convert("L")).point(lambda v: 255 if v < INK_THRESHOLD else 0)
+    bbox = ink.getbbox()
+    if bbox:
+        left, top, right, bottom = bbox
+        image = image.crop((max(0, left - CROP_PADDING), max(0, top - CROP_PADDING),
+                            min(image.width, right + CROP_PADDING), min(image.height, bottom + CROP_PADDING)))
+    return image
+
+
+class OCRCache:
+    """SQLite map of image hash -> LaTeX, safe to share across threads."""
+
+    def __init__(self, path=OCR_CACHE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS ocr (hash TEXT PRIMARY KEY, latex TEXT NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, hashes):
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for i in range(0, len(unique), SQLITE_MAX_VARIABLES):
+                part = unique[i:i + SQLITE_MAX_VARIABLES]
+                rows = self._conn.execute(
+                    f"SELECT hash, latex FROM ocr WHERE hash IN ({','.join('?' * len(part))})", part
+                )
+                found.update(rows)
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def put(self, key, latex):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO ocr (hash, latex) VALUES (?, ?)", (key, latex))
+            self._conn.commit()
+
+
+# Each pool process loads its own model once
+_worker_model = None
+
+
+def _init_worker():
+    global _worker_model
+    from pix2tex.cli import LatexOCR
+
+    _worker_model = LatexOCR()
+
+
+def _ocr_in_worker(data):
+    return _worker_model(preprocess_image(Image.open(io.BytesIO(data))))
+
+
+class BatchOCR:
+    """Runs LaTeX-OCR over many images on a bounded pool, skipping images already in the cache.
+
+    With ``processes=False`` (the default, used by the app) the threads share
+    ``model`` and take turns calling it; with ``processes=True`` every worker
+    process loads its own.
+    """
+
+    def __init__(self, model=None, workers=OCR_WORKERS, processes=False, cache=None):
+        self.model = model
+        self.workers = workers
+        self.processes = processes
+        self.cache = cache if cache is not None else OCRCache()
+        self._model_lock = threading.Lock()
+
+    def _ocr(self, data):
+        image = preprocess_image(Image.open(io.BytesIO(data)))
+        with self._model_lock:
+            if self.model is None:
+                from pix2tex.cli import LatexOCR
+
+                self.model = LatexOCR()
+            return self.model(image)
+
+    def run(self, images, on_result=None):
+        """OCR an iterable of ``(name, bytes)``; returns one ``{"name", "latex", "error", "cached"}`` per image, in order.
+
+        ``images`` is consumed lazily, at most ``2 * workers`` misses ahead of
+        the pool. ``on_result`` is called with each result as it becomes
+        available, on the calling thread.
+        """
+        results = []
+        waiting = {}  # image hash -> result indices waiting on one in-flight OCR
+        in_flight = {}  # future -> image hash
+
+        def finish(indices, latex, error, from_cache):
+            for i in indices:
+                results[i] = {"name": results[i], "latex": latex, "error": error, "cached": from_cache}
+                if on_result is not None:
+                    on_result(results[i])
+
+        def collect(done):
+            for future in done:
+                key = in_flight.pop(future)
+                try:
+                    latex = future.result()
+                except Exception as e:
+                    finish(waiting.pop(key), None, str(e), False)
+                else:
+                    self.cache.put(key, latex)
+                    finish(waiting.pop(key), latex, None, False)
+
+        if self.processes:
+            pool, task = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker), _ocr_in_worker
+        else:
+            pool, task = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr"), self._ocr
+        with pool:
+            for name, data in images:
+                index = len(results)
+                results.append(name)  # replaced by the result dict in finish()
+                key = image_hash(data)
+                if key in waiting:
+                    waiting[key].append(index)
+                    continue
+                latex = self.cache.get(key)
+                if latex is not None:
+                    finish([index], latex, None, True)
+                    continue
+                # Keep a bounded window of images in flight so a whole worksheet is never held at once
+                if len(in_flight) >= self.workers * 2:
+                    collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+                waiting[key] = [index]
+                in_flight[pool.submit(task, data)] = key
+            collect(list(in_flight))
+        return results
+
+
+def _read_images(paths):
+    for path in paths:
+        with open(path, "rb") as f:
+            yield os.path.basename(path), f.read()
+
+
+def iter_image_files(directory):
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            yield os.path.join(directory, name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract LaTeX from every math image in a directory.")
+    parser.add_argument("directory", help="directory of .png/.jpg/.jpeg images")
+    parser.add_argument("--output", help="JSON Lines file to write (default: stdout)")
+    parser.add_argument("--workers", type=int, default=OCR_WORKERS)
+    parser.add_argument("--processes", action="store_true", help="OCR in worker processes instead of threads")
+    parser.add_argument("--cache", default=OCR_CACHE_PATH, help="SQLite result cache path")
+    args = parser.parse_args(argv)
+
+    ocr = BatchOCR(workers=args.workers, processes=args.processes, cache=OCRCache(args.cache))
+    results = ocr.run(_read_images(iter_image_files(args.directory)))
+    failed = sum(result["error"] is not None for result in results)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for result in results:
+            out.write(json.dumps(result) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{len(results) - failed}/{len(results)} images recognized", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""CPU-friendly Hugging Face backend for the LangChain agent.
+
+The model can be loaded quantized for machines without a GPU: ``int8`` uses
+PyTorch dynamic quantization of the linear layers and ``int4`` uses
+optimum-quanto weights (bitsandbytes is used instead when CUDA is present).
+
+Each ReAct step sends the previous prompt plus the last thought, action and
+observation, so consecutive prompts share a long prefix. The key/value cache
+of the last generation is kept and cropped to the prefix the next prompt
+shares with it, so only the new tokens are run through the model. Only the
+generated tokens are decoded (the prompt is never echoed back), and generation
+stops at the agent's stop sequences such as ``Observation:``.
+"""
+import os
+import threading
+from typing import Any, List, Optional
+
+from langchain_core.language_models.llms import LLM
+
+HF_MODEL_ID = os.getenv("HF_MODEL_ID", "deepseek-ai/deepseek-llm-7b-base")
+# "float32", "bfloat16", "int8" or "int4"
+HF_PRECISION = os.getenv("HF_PRECISION", "float32")
+HF_MAX_NEW_TOKENS = int(os.getenv("HF_MAX_NEW_TOKENS", 200))
+HF_REUSE_KV_CACHE = os.getenv("HF_REUSE_KV_CACHE", "true").lower() == "true"
+HF_THREADS = int(os.getenv("HF_THREADS", 0))  # 0 keeps PyTorch's default
+
+# The ReAct agent passes this itself; it is also the default for direct calls
+REACT_STOP = ["\nObservation:"]
+
+
+def load_model(model_id=HF_MODEL_ID, precision=HF_PRECISION, token=None):
+    """Load ``(tokenizer, model)`` at ``precision``, quantizing on CPU when there is no GPU."""
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    load_kwargs = {"token": token, "low_cpu_mem_usage": True}
+    on_gpu = torch.cuda.is_available()
+    if precision == "bfloat16":
+        load_kwargs["torch_dtype"] = torch.bfloat16
+    elif precision in ("int8", "int4") and on_gpu:
+        from transformers import BitsAndBytesConfig
+
+        load_kwargs["device_map"] = "auto"
+        load_kwargs["quantization_config"] = (
+            BitsAndBytesConfig(load_in_8bit=True) if precision == "int8"
+            else BitsAndBytesConfig(load_in_4bit=True, bnb_4bit_compute_dtype=torch.bfloat16)
+        )
+    elif precision == "int4":
+        from transformers import QuantoConfig
+
+        load_kwargs["quantization_config"] = QuantoConfig(weights="int4")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id, token=token)
+    model = AutoModelForCausalLM.from_pretrained(model_id, **load_kwargs)
+    if precision == "int8" and not on_gpu:
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.eval()
+    return tokenizer, model
+
+
+def truncate_at_stop(text, stop):
+    cut = min((text.find(s) for s in stop if s in text), default=len(text))
+    return text[:cut]
+
+
+class HFGenerator:
+    """Greedy generation with key/value cache reuse across prompts that share a prefix."""
+
+    def __init__(self, model_id=HF_MODEL_ID, precision=HF_PRECISION, max_new_tokens=HF_MAX_NEW_TOKENS,
+                 reuse_kv_cache=HF_REUSE_KV_CACHE, token=None):
+        import torch
+
+        if HF_THREADS:
+            torch.set_num_threads(HF_THREADS)
+        self.tokenizer, self.model = load_model(model_id, precision, token)
+        self.max_new_tokens = max_new_tokens
+        self.reuse_kv_cache = reuse_kv_cache
+        # The model and its cache are shared by every session, so generation is serialized
+        self._lock = threading.Lock()
+        self._cache = None
+        self._cache_ids = None
+
+    def _prefix_cache(self, input_ids):
+        from transformers import DynamicCache
+
+        cache, self._cache = self._cache, None
+        if cache is None or not self.reuse_kv_cache:
+            return DynamicCache()
+        # At least one prompt token must be left for the model to run on
+        limit = min(len(self._cache_ids), input_ids.shape[1] - 1)
+        mismatch = (self._cache_ids[:limit] != input_ids[0, :limit]).nonzero()
+        shared = int(mismatch[0]) if len(mismatch) else limit
+        if shared == 0:
+            return DynamicCache()
+        cache.crop(shared)
+        return cache
+
+    def generate(self, prompt, stop=None):
+        import torch
+
+        stop = stop or REACT_STOP
+        device = next(self.model.parameters()).device
+        inputs = self.tokenizer(prompt, return_tensors="pt").to(device)
+        prompt_length = inputs["input_ids"].shape[1]
+        with self._lock, torch.inference_mode():
+            output = self.model.generate(
+                **inputs,
+                past_key_values=self._prefix_cache(inputs["input_ids"]),
+                max_new_tokens=self.max_new_tokens,
+                do_sample=False,
+                stop_strings=stop,
+                tokenizer=self.tokenizer,
+                pad_token_id=self.tokenizer.pad_token_id or self.tokenizer.eos_token_id,
+                return_dict_in_generate=True,
+            )
+            # The cache covers every token except the last one generated
+            self._cache = output.past_key_values
+            self._cache_ids = output.sequences[0, :self._cache.get_seq_length()]
+        text = self.tokenizer.decode(output.sequences[0, prompt_length:], skip_special_tokens=True)
+        return truncate_at_stop(text, stop)
+
+
+class HFLLM(LLM):
+    """LangChain LLM over an ``HFGenerator``, usable by the ReAct agent."""
+
+    generator: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "huggingface-local"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        return self.generator.generate(prompt, stop=stop)
@@ -0,0 +1,207 @@
+"""Deterministic parsing of common math commands, so they skip the LLM agent.
+
+Recognizes plain-text commands such as ``differentiate sin(x)*x^2``,
+``integrate x^2 from 0 to 1``, ``simplify (x^2-1)/(x-1)``,
+``solve x^2 = 4 for x`` and ``limit of sin(x)/x as x -> 0`` (with the variable
+given by "with respect to", "wrt", "for", ``d/dt`` or ``dt``), and the LaTeX
+that OCR produces for them: ``\\frac{d}{dx}``, ``\\int_a^b ... dx``,
+``\\lim_{x \\to a}`` and bare equations. Anything that does not parse cleanly
+returns ``None`` and is left to the agent.
+
+Only text manipulation happens here: every candidate expression is parsed by
+the SymPy engine's sandboxed, time-limited workers, never in this process.
+"""
+import re
+
+from sympy_engine import get_engine
+from sympy_tools import compute_derivative, compute_integral, compute_limit, compute_simplify, compute_solve
+
+_GREEK = {
+    "alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta", "iota", "kappa", "lambda", "mu",
+    "nu", "xi", "omicron", "rho", "sigma", "tau", "upsilon", "phi", "chi", "psi", "omega",
+}
+_VARIABLE = rf"(?:{'|'.join(sorted(_GREEK, key=len, reverse=True))}|[A-Za-z](?:_?\d+)?)"
+_ORDERS = {"first": 1, "second": 2, "third": 3}
+_POINTS = {"infinity": "oo", "inf": "oo", "-infinity": "-oo", "-inf": "-oo"}
+
+_LEAD = r"^(?:please\s+)?(?:(?:find|compute|calculate|evaluate|what\s+is)\s+)?(?:the\s+)?"
+_COMMANDS = [
+    ("derivative", re.compile(
+        _LEAD + r"(?:(?P<order>first|second|third)\s+)?(?:derivative\s+of|differentiate|diff)\s+(?P<rest>.+)$",
+        re.IGNORECASE)),
+    ("derivative", re.compile(_LEAD + rf"d/d(?P<variable>{_VARIABLE})\s*(?P<rest>.+)$", re.IGNORECASE)),
+    ("integral", re.compile(
+        _LEAD + r"(?:integrate|(?:definite\s+|indefinite\s+)?integral\s+of|antiderivative\s+of)\s+(?P<rest>.+)$",
+        re.IGNORECASE)),
+    ("simplify", re.compile(_LEAD + r"(?:simplify|simplified\s+form\s+of)\s+(?P<rest>.+)$", re.IGNORECASE)),
+    ("solve", re.compile(_LEAD + r"(?:solve|roots\s+of)\s+(?P<rest>.+)$", re.IGNORECASE)),
+    ("limit", re.compile(_LEAD + r"(?:limit|lim)(?:\s+of)?\s+(?P<rest>.+)$", re.IGNORECASE)),
+]
+
+_WITH_RESPECT_TO = re.compile(
+    rf"\s*,?\s+(?:with\s+respect\s+to|w\.?r\.?t\.?|for|in\s+terms\s+of)\s+(?P<variable>{_VARIABLE})$",
+    re.IGNORECASE)
+_BOUNDS = re.compile(r"\s+from\s+(?P<lower>\S+)\s+to\s+(?P<upper>\S+)$", re.IGNORECASE)
+_DIFFERENTIAL = re.compile(rf"(?:\s+|\s*\\[,;!]\s*|\s*\*\s*)d(?P<variable>{_VARIABLE})$")
+_APPROACHES = r"\s*(?:->|→|\\to|approaches|tends\s+to|goes\s+to)\s*"
+_AS_POINT = re.compile(rf"\s*,?\s+as\s+(?P<variable>{_VARIABLE}){_APPROACHES}(?P<point>\S+)$", re.IGNORECASE)
+_POINT_FIRST = re.compile(rf"^(?P<variable>{_VARIABLE}){_APPROACHES}(?P<point>\S+?)\s*,?\s+(?P<rest>.+)$")
+
+_LATEX_DERIVATIVE = re.compile(rf"^\\frac\{{d\}}\{{d(?P<variable>{_VARIABLE})\}}\s*(?P<rest>.+)$")
+_LATEX_INTEGRAL = re.compile(
+    r"^\\int(?:\s*_\s*(?:\{(?P<lower>[^{}]+)\}|(?P<lower1>\S))\s*\^\s*(?:\{(?P<upper>[^{}]+)\}|(?P<upper1>\S)))?"
+    r"\s*(?P<rest>.+)$")
+_LATEX_LIMIT = re.compile(
+    rf"^\\lim\s*_\s*\{{\s*(?P<variable>{_VARIABLE})\s*(?:\\to|\\rightarrow|->)\s*(?P<point>[^{{}}]+)\}}\s*(?P<rest>.+)$")
+
+
+# ---------------------------------------------------------------------------
+# EXPRESSIONS
+# ---------------------------------------------------------------------------
+
+
+def latex_to_text(text):
+    """Rewrite common LaTeX math into SymPy-parsable text."""
+    text = re.sub(r"\\(?:left|right|displaystyle)\b|\\[,;:! ]|\$", " ", text)
+    text = re.sub(r"\\(?:cdot|times)\b", "*", text)
+    previous = None
+    while previous != text:
+        previous = text
+        text = re.sub(r"\\[dt]?frac\s*\{([^{}]*)\}\s*\{([^{}]*)\}", r"((\1)/(\2))", text)
+        text = re.sub(r"\\sqrt\s*\[([^\[\]]*)\]\s*\{([^{}]*)\}", r"root(\2, \1)", text)
+        text = re.sub(r"\\sqrt\s*\{([^{}]*)\}", r"sqrt(\1)", text)
+    text = re.sub(r"\\(?:infty|infin)\b", "oo", text)
+    text = re.sub(r"\\ln\b", "log", text)
+    text = re.sub(r"_\s*\{([^{}]*)\}", r"\1", text)
+    text = re.sub(r"\\(?:operatorname\s*\{(\w+)\}|(\w+))", lambda m: m.group(1) or m.group(2), text)
+    return text.replace("{", "(").replace("}", ")")
+
+
+def to_text(expression, is_latex):
+    """Normalize user or OCR input into text the SymPy tools accept (``e`` means Euler's number)."""
+    if is_latex:
+        expression = latex_to_text(expression)
+    return re.sub(r"(?<![\w.])e(?![\w(])", "E", expression.strip())
+
+
+def _inspect(text):
+    """``{"symbols", "equation"}`` for ``text``, or ``None`` when it is not a clean math expression."""
+    try:
+        info = get_engine().inspect(text)
+    except Exception:
+        return None
+    # Multi-letter symbols such as "area" usually mean words were parsed as math
+    if any(not re.fullmatch(_VARIABLE, name) for name in info["symbols"]):
+        return None
+    return info
+
+
+def _default_variable(names):
+    if "x" in names:
+        return "x"
+    return names[0] if len(names) == 1 else None
+
+
+# ---------------------------------------------------------------------------
+# INTENTS
+# ---------------------------------------------------------------------------
+
+
+def _strip_trailing(rest, pattern):
+    match = pattern.search(rest)
+    if match is None:
+        return rest, None
+    return rest[:match.start()].rstrip(), match
+
+
+def _intent(operation, rest, is_latex, variable=None, **args):
+    """Pull trailing clauses off ``rest`` and check it parses; ``None`` if anything is left unclear."""
+    rest, match = _strip_trailing(rest, _WITH_RESPECT_TO)
+    variable = match.group("variable") if match else variable
+    if operation == "integral":
+        # "x^2 dx from 0 to 1" and "x^2 from 0 to 1 dx" are both common
+        for pattern in (_DIFFERENTIAL, _BOUNDS, _DIFFERENTIAL):
+            rest, match = _strip_trailing(rest, pattern)
+            if match and pattern is _BOUNDS:
+                args.update(lower=match.group("lower"), upper=match.group("upper"))
+            elif match:
+                variable = match.group("variable")
+    if operation == "limit" and "point" not in args:
+        rest, match = _strip_trailing(rest, _AS_POINT)
+        if match is None:
+            match = _POINT_FIRST.match(rest)
+            rest = match.group("rest") if match else rest
+        if match is None:
+            return None
+        variable = match.group("variable")
+        args["point"] = match.group("point")
+
+    expression = to_text(rest, is_latex)
+    info = _inspect(expression)
+    if info is None:
+        return None
+    for key in ("lower", "upper", "point"):
+        if key in args:
+            args[key] = to_text(_POINTS.get(args[key].lower(), args[key]), is_latex)
+            if _inspect(args[key]) is None:
+                return None
+    if operation != "simplify":
+        variable = variable or _default_variable(info["symbols"])
+        if variable is None:
+            return None
+    return {"operation": operation, "expression": expression, "variable": variable, "args": args,
+            "equation": info["equation"]}
+
+
+def parse_intent(query):
+    """Map ``query`` to ``{"operation", "expression", "variable", "args"}``, or ``None`` for the agent."""
+    query = query.strip().rstrip("?.!").strip()
+    if not query:
+        return None
+    is_latex = "\\" in query or bool(re.search(r"[\^_]\{", query))
+    if is_latex:
+        latex_query = query.strip("$ ")
+        match = _LATEX_DERIVATIVE.match(latex_query)
+        if match:
+            return _intent("derivative", match.group("rest"), True, match.group("variable"))
+        match = _LATEX_INTEGRAL.match(latex_query)
+        if match:
+            lower = match.group("lower") or match.group("lower1")
+            upper = match.group("upper") or match.group("upper1")
+            bounds = {"lower": lower, "upper": upper} if lower is not None else {}
+            return _intent("integral", match.group("rest"), True, **bounds)
+        match = _LATEX_LIMIT.match(latex_query)
+        if match:
+            return _intent("limit", match.group("rest"), True, match.group("variable"),
+                           point=match.group("point"))
+
+    for operation, pattern in _COMMANDS:
+        match = pattern.match(query)
+        if match:
+            args = {}
+            if operation == "derivative" and match.groupdict().get("order"):
+                args["order"] = _ORDERS[match.group("order").lower()]
+            return _intent(operation, match.group("rest"), is_latex, match.groupdict().get("variable"), **args)
+
+    # A bare equation (typed or OCR'd) in one unknown is solved
+    if "=" in query and query.count("=") == 1:
+        intent = _intent("solve", query, is_latex)
+        if intent is not None and intent["equation"]:
+            return intent
+    return None
+
+
+def run_intent(intent):
+    """Call the matching SymPy tool; returns its result dict (with ``"error"`` on a timeout)."""
+    operation, expression, variable, args = (
+        intent["operation"], intent["expression"], intent["variable"], intent["args"]
+    )
+    if operation == "derivative":
+        return compute_derivative(expression, variable, args.get("order", 1))
+    if operation == "integral":
+        return compute_integral(expression, variable, args.get("lower"), args.get("upper"))
+    if operation == "simplify":
+        return compute_simplify(expression)
+    if operation == "solve":
+        return compute_solve(expression, variable)
+    return compute_limit(expression, variable, args["point"])
@@ -0,0 +1,328 @@
+"""Timeout-guarded, memoized execution of SymPy work for the math tools.
+
+SymPy calls run in a small pool of worker processes, so a hard integral can
+never hang the Streamlit script: each call has a time budget, and a worker
+that exceeds it is killed (cancelling the computation) and replaced by a
+newly started one, whose SymPy import finishes while it waits for work.
+
+User and LLM text is only ever parsed inside a worker, under the same budget
+(``9**9**9`` cannot stall the caller), and with a namespace restricted to
+SymPy classes and constants: no builtins, attribute access, dunder names or
+string literals, so parsing cannot run arbitrary code. Results are memoized
+in an LRU cache keyed on the canonical ``srepr`` form of the parsed
+expression, so ``x*sin(x)`` and ``sin(x) * x`` share an entry and repeated
+tool calls from the agent are free. Definite integrals that cannot be done
+symbolically within the budget fall back to numeric quadrature.
+"""
+import atexit
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import sympy
+from sympy import Basic, Eq, Function, Integral, diff, integrate, latex, limit, simplify, solve, srepr, sympify
+from sympy.parsing.sympy_parser import (
+    convert_equals_signs,
+    convert_xor,
+    implicit_application,
+    implicit_multiplication,
+    parse_expr,
+    standard_transformations,
+)
+
+SYMPY_WORKERS = int(os.getenv("SYMPY_WORKERS", 2))
+SYMPY_TIMEOUT = float(os.getenv("SYMPY_TIMEOUT", 10))
+NUMERIC_TIMEOUT = float(os.getenv("SYMPY_NUMERIC_TIMEOUT", 5))
+SYMPY_CACHE_SIZE = int(os.getenv("SYMPY_CACHE_SIZE", 512))
+NUMERIC_DIGITS = 15
+
+# "2x", "x^2", "sin x" and "x^2 = 4" are accepted as well as strict SymPy syntax
+TRANSFORMATIONS = standard_transformations + (
+    implicit_multiplication, implicit_application, convert_xor, convert_equals_signs
+)
+
+
+class SympyTimeout(TimeoutError):
+    """A SymPy call exceeded its time budget; the worker running it was killed."""
+
+
+# Python syntax that math never needs but sandbox escapes do
+_UNSAFE = re.compile(r"__|[\"'`;:\[\]{}@\\]|\.\s*[A-Za-z_]|\blambda\b")
+
+
+def _math_namespace():
+    namespace = {"__builtins__": {}}
+    for name in dir(sympy):
+        obj = getattr(sympy, name)
+        if isinstance(obj, Basic) or (isinstance(obj, type) and issubclass(obj, Basic)):
+            namespace[name] = obj
+    namespace.update(sqrt=sympy.sqrt, root=sympy.root, cbrt=sympy.cbrt)
+    return namespace
+
+
+_NAMESPACE = _math_namespace()
+_CALL = re.compile(r"\b([A-Za-z_]\w*)\s*\(")
+
+
+def _undefined_functions(text):
+    """``f`` in ``f(x)*g(x)`` as a SymPy ``Function``, so implicit multiplication does not read it as ``f*x``.
+
+    A name that is also used on its own, as ``x`` in ``x(x+1)``, stays a symbol.
+    """
+    functions = {}
+    for name in set(_CALL.findall(text)) - set(_NAMESPACE):
+        if not re.search(rf"\b{name}\b(?!\s*\()", text):
+            functions[name] = Function(name)
+    return functions
+
+
+def parse_math(text, evaluate=True):
+    """Parse user or LLM supplied math into a SymPy expression; only call this inside a worker."""
+    text = str(text).strip()
+    if _UNSAFE.search(text):
+        raise ValueError(f"Unsupported characters in expression: {text!r}")
+    expr = parse_expr(text, local_dict=_undefined_functions(text), global_dict=dict(_NAMESPACE),
+                      transformations=TRANSFORMATIONS, evaluate=evaluate)
+    if not isinstance(expr, Basic):
+        raise ValueError(f"Not a math expression: {text!r}")
+    return expr
+
+
+# ---------------------------------------------------------------------------
+# WORKER PROCESS
+# ---------------------------------------------------------------------------
+
+
+def _numeric_integral(expr, variable, lower, upper):
+    # Integral.evalf integrates with mpmath quadrature without attempting an antiderivative
+    return Integral(expr, (variable, lower, upper)).evalf(NUMERIC_DIGITS)
+
+
+def _integral(expr, variable, lower=None, upper=None):
+    if lower is None:
+        return integrate(expr, variable)
+    return integrate(expr, (variable, lower, upper))
+
+
+OPERATIONS = {
+    "derivative": lambda expr, variable, order=1: diff(expr, variable, order),
+    "integral": _integral,
+    "numeric_integral": _numeric_integral,
+    "simplify": simplify,
+    "solve": solve,
+    # Two-sided by default: a limit whose one-sided values differ is an error
+    "limit": lambda expr, variable, point: limit(expr, variable, point, "+-"),
+}
+
+
+def _handle(operation, args):
+    if operation == "canonicalize":
+        # Raw text in, one srepr per argument out; srepr is what every other operation receives
+        return tuple(srepr(parse_math(arg)) for arg in args)
+    if operation == "inspect":
+        expr = parse_math(args[0], evaluate=False)
+        return {"symbols": sorted(s.name for s in expr.free_symbols), "equation": isinstance(expr, Eq)}
+    result = OPERATIONS[operation](*[sympify(arg) for arg in args])
+    return {
+        "result": str(result),
+        "latex": latex(result),
+        "unevaluated": bool(getattr(result, "has", lambda *_: False)(Integral)),
+    }
+
+
+def _worker_main(conn):
+    # Requests are (operation, args); replies are (ok, payload) with rendering done here too
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        operation, args = request
+        try:
+            conn.send((True, _handle(operation, args)))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.kill()
+
+
+# ---------------------------------------------------------------------------
+# ENGINE
+# ---------------------------------------------------------------------------
+
+
+class SympyEngine:
+    """Runs SymPy operations on worker processes with per-call timeouts and an LRU result cache."""
+
+    def __init__(self, workers=SYMPY_WORKERS, timeout=SYMPY_TIMEOUT, numeric_timeout=NUMERIC_TIMEOUT,
+                 cache_size=SYMPY_CACHE_SIZE):
+        self.timeout = timeout
+        self.numeric_timeout = numeric_timeout
+        self.cache_size = cache_size
+        # Spawned rather than forked: the Streamlit server process is multi-threaded
+        self._context = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(workers)
+        # Workers are started up front so their SymPy import does not count against a call's budget
+        self._idle = queue.Queue()
+        for _ in range(workers):
+            self._idle.put(_Worker(self._context))
+        self._cache = OrderedDict()
+        # Normalized input text -> canonical key, so repeated text skips the canonicalize round trip
+        self._aliases = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _execute(self, operation, args, timeout):
+        if timeout <= 0:
+            raise SympyTimeout(f"{operation} ran out of its time budget")
+        deadline = time.monotonic() + timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise SympyTimeout(f"{operation} timed out waiting for a free worker")
+        worker = self._idle.get()
+        try:
+            try:
+                worker.conn.send((operation, args))
+                finished = worker.conn.poll(max(0.0, deadline - time.monotonic()))
+                if finished:
+                    ok, payload = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                raise RuntimeError(f"SymPy worker exited during {operation}") from e
+            if not finished:
+                # Killing the worker is the only way to cancel a running SymPy call
+                raise SympyTimeout(f"{operation} exceeded its {timeout:.1f}s budget")
+        except BaseException:
+            worker.kill()
+            # Starting the process is quick; its SymPy import runs while it sits in the idle queue
+            self._idle.put(_Worker(self._context))
+            raise
+        else:
+            self._idle.put(worker)
+        finally:
+            self._slots.release()
+        if not ok:
+            raise ValueError(payload)
+        return payload
+
+    def _key(self, operation, args, deadline):
+        """Canonical cache key for ``args``; parsing happens in a worker within ``deadline``."""
+        raw = tuple(" ".join(str(arg).split()) for arg in args)
+        with self._lock:
+            canonical = self._aliases.get(raw)
+            if canonical is not None:
+                self._aliases.move_to_end(raw)
+        if canonical is None:
+            canonical = self._execute("canonicalize", raw, deadline - time.monotonic())
+            with self._lock:
+                self._aliases[raw] = canonical
+                if len(self._aliases) > self.cache_size:
+                    self._aliases.popitem(last=False)
+        return operation, canonical
+
+    def _cached(self, key):
+        with self._lock:
+            if key not in self._cache:
+                return None
+            self._cache.move_to_end(key)
+            return dict(self._cache[key])
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _compute(self, key, deadline):
+        result = self._cached(key)
+        if result is None:
+            operation, canonical = key
+            result = dict(self._execute(operation, canonical, deadline - time.monotonic()), method="symbolic")
+            self._remember(key, result)
+        return dict(result)
+
+    def run(self, operation, *args, timeout=None):
+        """Run ``operation`` on ``args`` (text or numbers); results are cached on their canonical form.
+
+        Parsing and computing share one budget of ``timeout`` seconds.
+        """
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        return self._compute(self._key(operation, args, deadline), deadline)
+
+    def inspect(self, expr, timeout=None):
+        """Parse ``expr`` without evaluating it; returns ``{"symbols", "equation"}``."""
+        return self._execute("inspect", (str(expr),), self.timeout if timeout is None else timeout)
+
+    def derivative(self, expr, variable="x", order=1):
+        return self.run("derivative", expr, variable, order)
+
+    def simplify(self, expr):
+        return self.run("simplify", expr)
+
+    def solve(self, expr, variable="x"):
+        return self.run("solve", expr, variable)
+
+    def limit(self, expr, variable="x", point=0):
+        return self.run("limit", expr, variable, point)
+
+    def integral(self, expr, variable="x", lower=None, upper=None):
+        """Integrate symbolically, falling back to quadrature for definite integrals over budget."""
+        if lower is None or upper is None:
+            return self.run("integral", expr, variable)
+        deadline = time.monotonic() + self.timeout
+        key = self._key("integral", (expr, variable, lower, upper), deadline)
+        # A cached numeric fallback is stored under the symbolic key so the slow attempt is not repeated
+        try:
+            result = self._compute(key, deadline)
+        except SympyTimeout:
+            result = None
+        if result is None or result["unevaluated"]:
+            numeric_key = ("numeric_integral", key[1])
+            result = dict(self._compute(numeric_key, time.monotonic() + self.numeric_timeout), method="numeric")
+            self._remember(key, result)
+        return result
+
+    def shutdown(self):
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                return
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Process-wide engine shared by every session and tool."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = SympyEngine()
+            atexit.register(_engine.shutdown)
+        return _engine
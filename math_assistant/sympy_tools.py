@@ -1,33 +1,158 @@
-# sympy_tools.py
-from sympy import symbols, diff, integrate, sympify, latex
 from langchain.tools import Tool
 
-def compute_derivative(expr_str: str) -> dict:
-    x = symbols("x")
-    expr = sympify(expr_str)
-    deriv = diff(expr, x)
+from sympy_engine import SympyTimeout, get_engine
+
+
+def _failure(e):
+    # Parse errors, timeouts and dead workers go back to the agent as an observation, not an exception
+    return {"error": str(e) or type(e).__name__}
+
+
+def _usage_error(parts, counts, usage):
+    # Empty input or a lone integration bound would otherwise fail obscurely or be silently ignored
+    if len(parts) not in counts:
+        return {"error": f"expected {usage}"}
+    return None
+
+
+def split_tool_input(text: str) -> list:
+    """Split ``"expr, var, a, b"`` on top-level commas; quotes the agent adds are dropped."""
+    parts, depth, current = [], 0, ""
+    for char in text.strip().strip("'\"`"):
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+        else:
+            current += char
+    parts.append(current.strip())
+    return [part for part in parts if part]
+
+
+def compute_derivative(expr_str: str, variable: str = "x", order=1) -> dict:
+    parts = split_tool_input(expr_str)
+    error = _usage_error(parts, (1, 2, 3), "expr[, var[, order]]")
+    if error:
+        return error
+    variable = parts[1] if len(parts) > 1 else variable
+    order = parts[2] if len(parts) > 2 else order
+    try:
+        result = get_engine().derivative(parts[0], variable, order)
+    except Exception as e:
+        return _failure(e)
+    return {
+        "derivative": result["result"],
+        "latex": result["latex"]
+    }
+
+
+def compute_integral(expr_str: str, variable: str = "x", lower=None, upper=None) -> dict:
+    parts = split_tool_input(expr_str)
+    error = _usage_error(parts, (1, 2, 4), "expr[, var[, lower, upper]]")
+    if error:
+        return error
+    variable = parts[1] if len(parts) > 1 else variable
+    if len(parts) == 4:
+        lower, upper = parts[2], parts[3]
+    try:
+        result = get_engine().integral(parts[0], variable, lower, upper)
+    except SympyTimeout as e:
+        return {"error": f"{e}; give integration bounds for a numeric answer"}
+    except Exception as e:
+        return _failure(e)
+    return {
+        "integral": result["result"],
+        "latex": result["latex"],
+        "method": result["method"]
+    }
+
+
+def compute_simplify(expr_str: str) -> dict:
+    try:
+        result = get_engine().simplify(expr_str.strip().strip("'\"`"))
+    except Exception as e:
+        return _failure(e)
     return {
-        "derivative": str(deriv),
-        "latex": latex(deriv)
+        "simplified": result["result"],
+        "latex": result["latex"]
     }
 
-def compute_integral(expr_str: str) -> dict:
-    x = symbols("x")
-    expr = sympify(expr_str)
-    integral = integrate(expr, x)
+
+def compute_solve(expr_str: str, variable: str = "x") -> dict:
+    parts = split_tool_input(expr_str)
+    error = _usage_error(parts, (1, 2), "equation[, var]")
+    if error:
+        return error
+    variable = parts[1] if len(parts) > 1 else variable
+    try:
+        result = get_engine().solve(parts[0], variable)
+    except Exception as e:
+        return _failure(e)
+    return {
+        "solutions": result["result"],
+        "latex": result["latex"]
+    }
+
+
+def compute_limit(expr_str: str, variable: str = "x", point="0") -> dict:
+    parts = split_tool_input(expr_str)
+    error = _usage_error(parts, (1, 2, 3), "expr[, var[, point]]")
+    if error:
+        return error
+    variable = parts[1] if len(parts) > 1 else variable
+    point = parts[2] if len(parts) > 2 else point
+    try:
+        result = get_engine().limit(parts[0], variable, point)
+    except Exception as e:
+        return _failure(e)
     return {
-        "integral": str(integral),
-        "latex": latex(integral)
+        "limit": result["result"],
+        "latex": result["latex"]
     }
 
+
 sympy_derivative_tool = Tool(
     name="sympy_derivative",
     func=compute_derivative,
-    description="Use to differentiate a SymPy-compatible expression with respect to x"
+    description=(
+        "Use to differentiate a SymPy-compatible expression. "
+        "Input: 'expression' (with respect to x), 'expression, variable' or 'expression, variable, order'"
+    )
 )
 
 sympy_integral_tool = Tool(
     name="sympy_integral",
     func=compute_integral,
-    description="Use to compute the integral of a SymPy-compatible expression with respect to x"
+    description=(
+        "Use to compute the integral of a SymPy-compatible expression. "
+        "Input: 'expression' (indefinite, with respect to x), 'expression, variable' "
+        "or 'expression, variable, lower, upper' for a definite integral (use oo for infinity)"
+    )
+)
+
+sympy_simplify_tool = Tool(
+    name="sympy_simplify",
+    func=compute_simplify,
+    description="Use to simplify a SymPy-compatible expression. Input: 'expression'"
+)
+
+sympy_solve_tool = Tool(
+    name="sympy_solve",
+    func=compute_solve,
+    description=(
+        "Use to solve an equation or find the roots of an expression. "
+        "Input: 'equation' (for x, e.g. 'x^2 = 4') or 'equation, variable'"
+    )
+)
+
+sympy_limit_tool = Tool(
+    name="sympy_limit",
+    func=compute_limit,
+    description=(
+        "Use to compute a two-sided limit. "
+        "Input: 'expression, variable, point' (use oo for infinity), e.g. 'sin(x)/x, x, 0'"
+    )
 )
@@ -0,0 +1,22 @@
+"""Regression checks for the SymPy tools; run with ``python -m pytest test_sympy_tools.py``."""
+from sympy_engine import parse_math
+from sympy_tools import compute_derivative, compute_integral
+
+
+def test_undefined_function_is_not_implicit_multiplication():
+    assert str(parse_math("f(x)")) == "f(x)"
+    assert str(parse_math("f(x)*g(x)")) == "f(x)*g(x)"
+    assert compute_derivative("f(x)")["derivative"] == "Derivative(f(x), x)"
+
+
+def test_implicit_multiplication_still_applies():
+    assert str(parse_math("x(x+1)")) == "x*(x + 1)"
+    assert str(parse_math("2x")) == "2*x"
+    assert str(parse_math("sin x")) == "sin(x)"
+
+
+def test_tool_input_arity_is_checked():
+    assert compute_derivative("") == {"error": "expected expr[, var[, order]]"}
+    assert compute_integral("") == {"error": "expected expr[, var[, lower, upper]]"}
+    assert compute_integral("x**2, x, 0") == {"error": "expected expr[, var[, lower, upper]]"}
+    assert compute_integral("x**2, x, 0, 1")["integral"] == "1/3"
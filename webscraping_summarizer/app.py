@@ -1,26 +1,41 @@
 import os
 import gradio as gr
-from newspaper import Article
 from langchain_groq import ChatGroq
-from langchain.prompts import PromptTemplate
 from urllib.parse import urlparse
+import re
 import time
 import requests
+from article_cache import fetch_article, get_cache, summary_key
+# The summary prompt is shared with the bulk CLI so cached summaries are reused
+from summarization import stream_summary, summarize_text, summary_prompt as prompt
+from keywords import article_keywords
+from exa_client import get_exa_client, split_queries
+from bulk_summarizer import iter_summaries, DEFAULT_FETCH_WORKERS, DEFAULT_LLM_WORKERS
+import metrics
+
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama3-8b-8192")
+
+# Expose /metrics and /metrics.json when METRICS_PORT is set
+metrics.start_metrics_server()
 
 # Global variables to store user-provided API keys
 user_groq_api_key = None
 user_exa_api_key = None
 user_llm = None
 
-# Prompt template for summarization
-prompt = PromptTemplate(
-    input_variables=["text"],
-    template="""You are a professional article summarizer. Please summarize the following article in 5 clear, informative bullet points. Focus on the main points, key insights, and important details:
+# Batch processing limits
+MAX_BATCH_URLS = 200
 
-{text}
+GROQ_KEY_MISSING_MESSAGE = """❌ Groq API key not configured. 
+
+**To get started:**
+1. Get a free API key from https://console.groq.com/
+2. Go to the "🔑 API Keys" tab
+3. Enter your API key and click "Save Keys"
+4. Try summarizing again
 
-Provide a concise summary in bullet points:"""
-)
+**For testing without API key:**
+The interface will still load, but you'll need to configure the API key to use the summarization feature."""
 
 def initialize_llm(api_key):
     """Initialize Groq LLM with the provided API key"""
@@ -29,7 +44,7 @@ def initialize_llm(api_key):
         try:
             user_llm = ChatGroq(
                 groq_api_key=api_key.strip(),
-                model_name="llama3-8b-8192"
+                model_name=GROQ_MODEL
             )
             return "✅ Groq API key configured successfully!"
         except Exception as e:
@@ -77,39 +92,23 @@ def search_articles_exa(query, max_results=5):
         if query.startswith('http'):
             return "⚠️ Please enter a search term, not a URL. For direct URL processing, use the Direct URL tab."
             
-        # EXA Search API endpoint
-        url = "https://api.exa.ai/search"
-        
-        headers = {
-            "Authorization": f"Bearer {user_exa_api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        # EXA Search parameters
-        params = {
-            "query": f"{query} news articles",
-            "numResults": min(max_results, 10),
-            "includeDomains": ["bbc.com", "reuters.com", "cnn.com", "theverge.com", "techcrunch.com"],
-            "excludeDomains": [],
-            "useAutoprompt": True,
-            "type": "keyword"
-        }
+        # Each line (or ';'-separated part) is a separate query, run concurrently
+        queries = split_queries(query)
+        if not queries:
+            return "⚠️ Please enter a search term."
         
-        response = requests.post(url, headers=headers, json=params)
-        response.raise_for_status()
+        results = get_exa_client(user_exa_api_key).search_many(queries, max_results)
         
-        data = response.json()
-        
-        if 'results' in data and data['results']:
+        if results:
             # Format results for display
-            output = f"## 🔍 Search Results for: {query}\n\n"
-            output += f"Found {len(data['results'])} articles:\n\n"
+            output = f"## 🔍 Search Results for: {'; '.join(queries)}\n\n"
+            output += f"Found {len(results)} articles:\n\n"
             
-            for i, item in enumerate(data['results'], 1):
-                title = item.get('title', 'No title')
-                link = item.get('url', '')
-                snippet = item.get('text', '')[:200] + '...' if item.get('text') else 'No snippet available'
-                source = urlparse(link).netloc if link else 'Unknown source'
+            for i, item in enumerate(results, 1):
+                title = item['title'] or 'No title'
+                link = item['link']
+                snippet = item['snippet'] or 'No snippet available'
+                source = item['source'] or 'Unknown source'
                 
                 output += f"### {i}. {title}\n"
                 output += f"**Source:** {source}\n"
@@ -134,20 +133,8 @@ def extract_article_content(url):
         if is_pdf_url(url):
             return None, "❌ PDF files are not supported. Please use a web article URL."
         
-        # Add headers to mimic a real browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
-        
-        article = Article(url)
-        article.download()
-        article.parse()
-        article.nlp()
+        # Served from the persistent cache when possible (see article_cache.py)
+        article = fetch_article(url)
         
         if not article.text or len(article.text.strip()) < 50:
             return None, "⚠️ Article text is too short. This might be due to website blocking, JavaScript content, or paywall."
@@ -161,43 +148,22 @@ def generate_summary(text):
     if not user_llm:
         return "❌ Groq API key not configured. Please set your Groq API key in the API Keys tab.\n\nTo get started:\n1. Get a free API key from https://console.groq.com/\n2. Enter it in the API Keys tab\n3. Try summarizing again"
     
+    cache = get_cache()
+    key = summary_key(prompt.template, GROQ_MODEL, text)
+    cached = cache.get_summary(key)
+    if cached is not None:
+        return cached
+    
     try:
-        chain = prompt | user_llm
-        result = chain.invoke({"text": text})
-        return result.content
+        summary = summarize_text(user_llm, prompt, text)
+        cache.put_summary(key, summary)
+        return summary
     except Exception as e:
         return f"Failed to generate summary: {str(e)}"
 
-def summarize_article(url):
-    """Main function to summarize an article"""
-    if not url or not url.strip():
-        return "⚠️ Please enter a URL to summarize."
-    
-    if not is_valid_url(url):
-        return "❌ Please enter a valid URL (e.g., https://example.com/article)"
-    
-    # Check API keys
-    if not user_groq_api_key or user_groq_api_key == "your_groq_api_key_here":
-        return """❌ Groq API key not configured. 
-
-**To get started:**
-1. Get a free API key from https://console.groq.com/
-2. Go to the "🔑 API Keys" tab
-3. Enter your API key and click "Save Keys"
-4. Try summarizing again
-
-**For testing without API key:**
-The interface will still load, but you'll need to configure the API key to use the summarization feature."""
-    
-    # Extract article
-    article, error = extract_article_content(url)
-    if error:
-        return error
-    
-    # Generate summary
-    summary = generate_summary(article.text)
-    
-    # Format output
+def format_article_markdown(url, article, summary, include_text=True, show_keywords=True):
+    """Render an extracted article and its summary as a Markdown block"""
+    keywords = article_keywords(article) if show_keywords else []
     output = f"""
 ## 📄 {article.title}
 
@@ -211,12 +177,18 @@ The interface will still load, but you'll need to configure the API key to use t
 ## 🔍 AI Summary
 
 {summary}
-
+"""
+    
+    if show_keywords:
+        output += f"""
 ---
 
 ## 🏷️ Keywords
-{', '.join(article.keywords[:10]) if article.keywords else 'No keywords extracted'}
-
+{', '.join(keywords) if keywords else 'No keywords extracted'}
+"""
+    
+    if include_text:
+        output += f"""
 ---
 
 ## 📝 Full Article Text
@@ -225,6 +197,119 @@ The interface will still load, but you'll need to configure the API key to use t
     
     return output
 
+def generate_summary_stream(text):
+    """Yield the summary chunk by chunk as Groq streams it"""
+    if not user_llm:
+        yield GROQ_KEY_MISSING_MESSAGE
+        return
+    
+    cache = get_cache()
+    key = summary_key(prompt.template, GROQ_MODEL, text)
+    cached = cache.get_summary(key)
+    if cached is not None:
+        yield cached
+        return
+    
+    parts = []
+    try:
+        for chunk in stream_summary(user_llm, prompt, text):
+            parts.append(chunk)
+            yield chunk
+        cache.put_summary(key, "".join(parts))
+    except Exception as e:
+        yield f"\n\nFailed to generate summary: {str(e)}"
+
+def summarize_article(url, show_keywords=True):
+    """Main function to summarize an article, streaming the summary as it arrives"""
+    if not url or not url.strip():
+        yield "⚠️ Please enter a URL to summarize."
+        return
+    
+    if not is_valid_url(url):
+        yield "❌ Please enter a valid URL (e.g., https://example.com/article)"
+        return
+    
+    # Check API keys
+    if not user_groq_api_key or user_groq_api_key == "your_groq_api_key_here":
+        yield GROQ_KEY_MISSING_MESSAGE
+        return
+    
+    # Extract article
+    article, error = extract_article_content(url)
+    if error:
+        yield error
+        return
+    
+    # Show metadata right away, then fill in the summary as tokens arrive
+    yield format_article_markdown(url, article, "⏳ Generating summary...", show_keywords=show_keywords)
+    
+    summary = ""
+    for chunk in generate_summary_stream(article.text):
+        summary += chunk
+        yield format_article_markdown(url, article, summary, show_keywords=show_keywords)
+
+def parse_url_list(urls_text, urls_file=None):
+    """Collect unique URLs from pasted text and an optional uploaded .txt/.csv file"""
+    raw = urls_text or ""
+    if urls_file is not None:
+        # Gradio passes either a file path or a tempfile wrapper depending on version
+        file_path = urls_file if isinstance(urls_file, str) else urls_file.name
+        with open(file_path, encoding="utf-8", errors="ignore") as f:
+            raw += "\n" + f.read()
+    
+    urls, skipped, seen = [], [], set()
+    for token in re.split(r"[\s,;]+", raw):
+        token = token.strip().strip("\"'<>")
+        if not token or token in seen:
+            continue
+        seen.add(token)
+        if is_valid_url(token):
+            urls.append(token)
+        else:
+            skipped.append(token)
+    return urls, skipped
+
+def summarize_batch(urls_text, urls_file=None, fetch_workers=DEFAULT_FETCH_WORKERS, llm_workers=DEFAULT_LLM_WORKERS):
+    """Summarize many URLs through bounded worker pools, yielding results as they finish"""
+    if not user_groq_api_key or user_groq_api_key == "your_groq_api_key_here":
+        yield GROQ_KEY_MISSING_MESSAGE
+        return
+    
+    try:
+        urls, skipped = parse_url_list(urls_text, urls_file)
+    except OSError as e:
+        yield f"❌ Failed to read uploaded file: {str(e)}"
+        return
+    
+    if not urls:
+        yield "⚠️ Please paste or upload at least one valid URL."
+        return
+    
+    notes = []
+    if skipped:
+        notes.append(f"⚠️ Skipped {len(skipped)} invalid entries: {', '.join(skipped[:5])}{'...' if len(skipped) > 5 else ''}")
+    if len(urls) > MAX_BATCH_URLS:
+        notes.append(f"⚠️ Only the first {MAX_BATCH_URLS} of {len(urls)} URLs will be processed.")
+        urls = urls[:MAX_BATCH_URLS]
+    
+    blocks = []
+    
+    def render():
+        header = f"## 📚 Batch Progress: {len(blocks)}/{len(urls)} articles processed\n\n"
+        if notes:
+            header += "\n\n".join(notes) + "\n\n"
+        return header + "\n---\n".join(blocks)
+    
+    yield render()
+    
+    # Extraction and summarization run in separate bounded pools (see bulk_summarizer.py)
+    for result in iter_summaries(urls, generate_summary, fetch_workers, llm_workers):
+        if result.error:
+            blocks.append(f"\n## ❌ {result.url}\n\n{result.error}\n")
+        else:
+            blocks.append(format_article_markdown(result.url, result.article, result.summary, include_text=False))
+        yield render()
+
 # Create Gradio interface
 def create_interface():
     with gr.Blocks(
@@ -244,6 +329,7 @@ def create_interface():
         **✨ Features:**
         - 🔗 Extract articles from any URL
         - 🔍 Search for articles using EXA Search
+        - 📚 Batch-summarize many URLs at once
         - 🤖 AI-powered summarization
         - 📊 Article metadata and keywords
         - 🎯 Clean, bullet-point summaries
@@ -338,6 +424,11 @@ def create_interface():
                             lines=2
                         )
                         
+                        show_keywords = gr.Checkbox(
+                            label="🏷️ Extract keywords",
+                            value=True
+                        )
+                        
                         submit_btn = gr.Button(
                             "🚀 Summarize Article",
                             variant="primary",
@@ -373,24 +464,89 @@ def create_interface():
                 # Handle submission
                 submit_btn.click(
                     fn=summarize_article,
-                    inputs=url_input,
+                    inputs=[url_input, show_keywords],
                     outputs=url_output
                 )
                 
                 # Handle Enter key
                 url_input.submit(
                     fn=summarize_article,
-                    inputs=url_input,
+                    inputs=[url_input, show_keywords],
                     outputs=url_output
                 )
             
+            # Batch Mode
+            with gr.TabItem("📚 Batch URLs"):
+                with gr.Row():
+                    with gr.Column(scale=2):
+                        batch_urls_input = gr.Textbox(
+                            label="📚 Article URLs",
+                            placeholder="One URL per line (commas and spaces also work)",
+                            lines=8
+                        )
+                        
+                        batch_file_input = gr.File(
+                            label="📁 Or upload a .txt/.csv file of URLs",
+                            file_types=[".txt", ".csv"]
+                        )
+                        
+                        with gr.Row():
+                            fetch_workers = gr.Slider(
+                                label="Fetch Workers",
+                                minimum=1,
+                                maximum=32,
+                                value=DEFAULT_FETCH_WORKERS,
+                                step=1
+                            )
+                            
+                            llm_workers = gr.Slider(
+                                label="Summarization Workers",
+                                minimum=1,
+                                maximum=16,
+                                value=DEFAULT_LLM_WORKERS,
+                                step=1
+                            )
+                        
+                        batch_btn = gr.Button(
+                            "🚀 Summarize All",
+                            variant="primary",
+                            size="lg"
+                        )
+                    
+                    with gr.Column(scale=1):
+                        gr.Markdown(f"""
+                        **📋 Batch Instructions:**
+                        1. Configure API keys in the "🔑 API Keys" tab
+                        2. Paste URLs or upload a file (up to {MAX_BATCH_URLS})
+                        3. Adjust worker counts if needed
+                        4. Click "Summarize All"
+                        5. Summaries appear as each article finishes
+                        
+                        **⚙️ Workers:**
+                        - **Fetch:** parallel article downloads
+                        - **Summarization:** parallel Groq requests (lower this if you hit rate limits)
+                        """)
+                
+                with gr.Row():
+                    batch_output = gr.Markdown(
+                        label="📊 Batch Results",
+                        value="Paste a list of URLs above and click 'Summarize All' to get started."
+                    )
+                
+                # Handle batch submission (generator streams partial results)
+                batch_btn.click(
+                    fn=summarize_batch,
+                    inputs=[batch_urls_input, batch_file_input, fetch_workers, llm_workers],
+                    outputs=batch_output
+                )
+            
             # Search Mode
             with gr.TabItem("🔍 Search Articles"):
                 with gr.Row():
                     with gr.Column(scale=2):
                         search_query = gr.Textbox(
                             label="🔍 Search Query",
-                            placeholder="e.g., Multimedia Misinformation",
+                            placeholder="e.g., Multimedia Misinformation (one query per line to search several at once)",
                             lines=2
                         )
                         
@@ -448,6 +604,23 @@ def create_interface():
                     outputs=search_output
                 )
         
+            # Performance Mode
+            with gr.TabItem("📈 Performance"):
+                gr.Markdown("""
+                **Per-stage latency** over the most recent requests (rolling window), plus cache, retry and token counters.
+                Set `METRICS_PORT` to also serve Prometheus metrics at `/metrics` and a JSON report at `/metrics.json`.
+                """)
+                
+                refresh_metrics_btn = gr.Button("🔄 Refresh", variant="secondary")
+                
+                metrics_output = gr.Markdown(value=metrics.markdown_table())
+                
+                refresh_metrics_btn.click(
+                    fn=metrics.markdown_table,
+                    inputs=None,
+                    outputs=metrics_output
+                )
+        
         gr.Markdown("""
         ---
         **🔧 Built with:** Gradio, LangChain, Groq, newspaper3k, EXA Search  
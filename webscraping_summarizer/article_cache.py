@@ -0,0 +1,332 @@
+"""Persistent, size-bounded cache for extracted articles and generated summaries.
+
+Two layers share one SQLite file:
+
+* ``articles``  - normalized URL -> parsed article fields, revalidated with
+  ETag / Last-Modified once the TTL expires.
+* ``summaries`` - sha256(prompt template, model name, article text) -> summary.
+
+Each layer has its own byte budget and evicts least-recently-used rows when the
+budget is exceeded. Hit/miss counters are kept per process.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from newspaper import Article
+
+from fetcher import fetch
+from metrics import incr, timed
+
+# ---------------------------------------------------------------------------
+# CONFIGURATION
+# ---------------------------------------------------------------------------
+
+DEFAULT_CACHE_PATH = os.getenv("SUMMARIZER_CACHE_PATH", ".summarizer_cache.sqlite3")
+DEFAULT_ARTICLE_TTL = int(os.getenv("SUMMARIZER_ARTICLE_TTL", 6 * 60 * 60))
+DEFAULT_ARTICLE_MAX_BYTES = int(os.getenv("SUMMARIZER_ARTICLE_CACHE_MB", 200)) * 1024 * 1024
+DEFAULT_SUMMARY_MAX_BYTES = int(os.getenv("SUMMARIZER_SUMMARY_CACHE_MB", 50)) * 1024 * 1024
+
+# Query parameters that only track the visitor and never change the content
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref", "ref_src", "cmpid"}
+
+ArticleEntry = namedtuple("ArticleEntry", ["data", "fresh", "etag", "last_modified"])
+
+
+# ---------------------------------------------------------------------------
+# KEYS
+# ---------------------------------------------------------------------------
+
+
+def normalize_url(url: str) -> str:
+    """Canonicalize a URL so trivially different spellings share a cache entry."""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    path = parsed.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    return urlunparse((scheme, netloc, path, "", urlencode(query), ""))
+
+
+def summary_key(template: str, model_name: str, text: str) -> str:
+    """Content address for a summary: hash of prompt template, model and input text."""
+    digest = hashlib.sha256()
+    for part in (template, model_name, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# ARTICLE SNAPSHOT
+# ---------------------------------------------------------------------------
+
+
+class CachedArticle:
+    """Plain snapshot of the newspaper ``Article`` attributes the UIs display."""
+
+    FIELDS = ("url", "title", "text", "authors", "publish_date", "keywords", "meta_data", "meta_lang")
+
+    def __init__(self, url, title="", text="", authors=None, publish_date=None,
+                 keywords=None, meta_data=None, meta_lang=""):
+        self.url = url
+        self.title = title
+        self.text = text
+        self.authors = authors or []
+        self.publish_date = publish_date
+        self.keywords = keywords or []
+        self.meta_data = meta_data or {}
+        self.meta_lang = meta_lang
+
+    @classmethod
+    def from_article(cls, article) -> "CachedArticle":
+        return cls(**{field: getattr(article, field, None) for field in cls.FIELDS})
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CachedArticle":
+        data = dict(data)
+        if data.get("publish_date"):
+            data["publish_date"] = datetime.fromisoformat(data["publish_date"])
+        return cls(**data)
+
+    def to_dict(self) -> dict:
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        if self.publish_date:
+            data["publish_date"] = self.publish_date.isoformat()
+        # newspaper's meta_data can hold nested defaultdicts; keep it JSON-safe
+        data["meta_data"] = json.loads(json.dumps(self.meta_data, default=str))
+        return data
+
+
+# ---------------------------------------------------------------------------
+# CACHE
+# ---------------------------------------------------------------------------
+
+
+class SummarizerCache:
+    """SQLite-backed two-layer LRU cache, safe to share between threads."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, article_ttl: int = DEFAULT_ARTICLE_TTL,
+                 article_max_bytes: int = DEFAULT_ARTICLE_MAX_BYTES,
+                 summary_max_bytes: int = DEFAULT_SUMMARY_MAX_BYTES):
+        self.path = path
+        self.article_ttl = article_ttl
+        self.max_bytes = {"articles": article_max_bytes, "summaries": summary_max_bytes}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS articles (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS summaries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS articles_lru ON articles(last_access);
+            CREATE INDEX IF NOT EXISTS summaries_lru ON summaries(last_access);
+            """
+        )
+        self.counters = {
+            layer: {"hits": 0, "misses": 0, "evictions": 0}
+            for layer in ("articles", "summaries")
+        }
+        self.counters["articles"].update({"stale": 0, "revalidated": 0})
+
+    # -- articles -----------------------------------------------------------
+
+    def get_article(self, url: str) -> ArticleEntry | None:
+        """Return the cached article entry (fresh or stale), or None on a miss."""
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, etag, last_modified, fetched_at FROM articles WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._count("articles", "misses")
+                return None
+            self._conn.execute("UPDATE articles SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            fresh = now - row[3] < self.article_ttl
+            self._count("articles", "hits" if fresh else "stale")
+        return ArticleEntry(json.loads(row[0]), fresh, row[1], row[2])
+
+    def put_article(self, url: str, data: dict, etag: str | None = None,
+                    last_modified: str | None = None) -> None:
+        value = json.dumps(data)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), value, len(value), etag, last_modified, now, now),
+            )
+            self._evict("articles")
+            self._conn.commit()
+
+    def touch_article(self, url: str) -> None:
+        """Mark a stale entry as fresh again after a 304 Not Modified."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE articles SET fetched_at = ? WHERE key = ?", (time.time(), normalize_url(url))
+            )
+            self._conn.commit()
+            self._count("articles", "revalidated")
+
+    def article_texts(self, limit: int) -> list:
+        """Texts of the ``limit`` most recently used cached articles (the keyword IDF corpus)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT value FROM articles ORDER BY last_access DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [json.loads(row[0]).get("text") or "" for row in rows]
+
+    def article_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    # -- summaries ----------------------------------------------------------
+
+    def get_summary(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count("summaries", "misses")
+                return None
+            self._conn.execute("UPDATE summaries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self._count("summaries", "hits")
+        return row[0]
+
+    def put_summary(self, key: str, summary: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)",
+                (key, summary, len(summary), time.time()),
+            )
+            self._evict("summaries")
+            self._conn.commit()
+
+    # -- housekeeping -------------------------------------------------------
+
+    def _count(self, layer: str, event: str, amount: int = 1) -> None:
+        self.counters[layer][event] += amount
+        incr(f"cache.{layer}.{event}", amount)
+
+    def _evict(self, table: str) -> None:
+        """Drop least-recently-used rows until the table fits its byte budget."""
+        total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+        budget = self.max_bytes[table]
+        if total <= budget:
+            return
+        victims = []
+        for key, size in self._conn.execute(f"SELECT key, size FROM {table} ORDER BY last_access"):
+            if total <= budget:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany(f"DELETE FROM {table} WHERE key = ?", victims)
+        self._count(table, "evictions", len(victims))
+
+    def stats(self) -> dict:
+        """Counters plus current entry count and size for each layer."""
+        with self._lock:
+            result = {}
+            for table, counters in self.counters.items():
+                entries, size = self._conn.execute(
+                    f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {table}"
+                ).fetchone()
+                result[table] = dict(counters, entries=entries, bytes=size)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM articles")
+            self._conn.execute("DELETE FROM summaries")
+            self._conn.commit()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache() -> SummarizerCache:
+    """Process-wide cache instance shared by every session and worker thread."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = SummarizerCache()
+        return _default_cache
+
+
+# ---------------------------------------------------------------------------
+# CACHED EXTRACTION
+# ---------------------------------------------------------------------------
+
+
+@timed("article.extract")
+def fetch_article(url: str, cache: SummarizerCache | None = None):
+    """Download, parse and cache an article, revalidating stale entries.
+
+    Returns either a newspaper ``Article`` (fresh download) or a
+    ``CachedArticle`` snapshot; both expose the same display attributes.
+    Downloads go through the shared pooled client in ``fetcher.py``.
+    Raises on network or parsing errors.
+    """
+    cache = cache or get_cache()
+    entry = cache.get_article(url)
+    if entry and entry.fresh:
+        return CachedArticle.from_dict(entry.data)
+
+    headers = {}
+    if entry:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+    response = fetch(url, headers=headers)
+    if entry and response.status_code == 304:
+        cache.touch_article(url)
+        return CachedArticle.from_dict(entry.data)
+    response.raise_for_status()
+
+    article = Article(url)
+    article.set_html(response.content)
+    with timed("article.parse"):
+        article.parse()
+    # Keywords are computed lazily by keywords.article_keywords when displayed
+
+    # Don't pin blocked or empty extractions for a whole TTL
+    if article.text and article.text.strip():
+        cache.put_article(
+            url,
+            CachedArticle.from_article(article).to_dict(),
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+    return article
@@ -0,0 +1,264 @@
+"""Headless bulk summarization: importable library plus a command-line interface.
+
+Library use::
+
+    from bulk_summarizer import make_llm, iter_summaries, cached_summarizer
+
+    llm = make_llm()
+    for result in iter_summaries(urls, cached_summarizer(llm)):
+        print(result.to_record())
+
+Command line::
+
+    python bulk_summarizer.py urls.txt -o digest.jsonl --fetch-workers 16 --llm-workers 4
+    cat urls.txt | python bulk_summarizer.py - -o digest.jsonl --resume
+
+Results are written as one JSON object per line as soon as each URL finishes,
+so the output file doubles as a checkpoint: ``--resume`` skips URLs that
+already have a successful record in it.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, Optional, Set
+
+from dotenv import load_dotenv
+
+from article_cache import fetch_article, get_cache, normalize_url, summary_key
+from keywords import article_keywords
+from summarization import summarize_text, summary_prompt
+
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama3-8b-8192")
+DEFAULT_FETCH_WORKERS = 8
+DEFAULT_LLM_WORKERS = 4
+MIN_ARTICLE_CHARS = 50
+
+
+# ---------------------------------------------------------------------------
+# LIBRARY
+# ---------------------------------------------------------------------------
+
+
+class SummaryResult:
+    """Outcome for one URL; ``article`` is kept in memory only."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.article = None
+        self.summary: Optional[str] = None
+        self.keywords: List[str] = []
+        self.error: Optional[str] = None
+        self.timings = {}
+
+    def to_record(self) -> dict:
+        article = self.article
+        return {
+            "url": self.url,
+            "title": article.title if article else None,
+            "authors": list(article.authors) if article else [],
+            "publish_date": article.publish_date.isoformat() if article and article.publish_date else None,
+            "summary": self.summary,
+            "keywords": self.keywords,
+            "error": self.error,
+            "timings": {stage: round(seconds, 3) for stage, seconds in self.timings.items()},
+        }
+
+
+def make_llm(api_key: Optional[str] = None, model_name: str = GROQ_MODEL):
+    """Groq chat model from an explicit key or ``GROQ_API_KEY``."""
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(groq_api_key=api_key or os.getenv("GROQ_API_KEY"), model_name=model_name)
+
+
+def cached_summarizer(llm, model_name: str = GROQ_MODEL) -> Callable[[str], str]:
+    """Summarize callable backed by the shared summary cache (same keys as the UIs)."""
+    cache = get_cache()
+
+    def _summarize(text: str) -> str:
+        key = summary_key(summary_prompt.template, model_name, text)
+        cached = cache.get_summary(key)
+        if cached is not None:
+            return cached
+        summary = summarize_text(llm, summary_prompt, text)
+        cache.put_summary(key, summary)
+        return summary
+
+    return _summarize
+
+
+def _extract(result: SummaryResult, with_keywords: bool) -> SummaryResult:
+    start = time.perf_counter()
+    try:
+        if result.url.lower().endswith(".pdf"):
+            raise ValueError("PDF files are not supported")
+        article = fetch_article(result.url)
+        if not article.text or len(article.text.strip()) < MIN_ARTICLE_CHARS:
+            raise ValueError("Article text is too short (blocked, JavaScript-rendered or paywalled)")
+        result.article = article
+        result.timings["extract"] = time.perf_counter() - start
+        if with_keywords:
+            start = time.perf_counter()
+            result.keywords = article_keywords(article)
+            result.timings["keywords"] = time.perf_counter() - start
+    except Exception as e:
+        result.error = f"extract: {e}"
+        result.timings["extract"] = time.perf_counter() - start
+    return result
+
+
+def _summarize(result: SummaryResult, summarize: Callable[[str], str]) -> SummaryResult:
+    start = time.perf_counter()
+    try:
+        result.summary = summarize(result.article.text)
+    except Exception as e:
+        result.error = f"summarize: {e}"
+    result.timings["summarize"] = time.perf_counter() - start
+    return result
+
+
+def iter_summaries(urls: Iterable[str], summarize: Callable[[str], str],
+                   fetch_workers: int = DEFAULT_FETCH_WORKERS,
+                   llm_workers: int = DEFAULT_LLM_WORKERS,
+                   with_keywords: bool = True) -> Iterator[SummaryResult]:
+    """Extract and summarize URLs through two bounded pools, yielding results as they finish.
+
+    Extraction is network-bound and summarization is rate-limited by the LLM
+    provider, so each stage has its own pool and articles move to the
+    summarization pool as soon as they are extracted. ``urls`` is consumed
+    lazily: at most ``2 * (fetch_workers + llm_workers)`` URLs are being
+    extracted or waiting for a summary at once, so memory stays flat however
+    long the input is.
+    """
+    fetch_workers, llm_workers = int(fetch_workers), int(llm_workers)
+    window = 2 * (fetch_workers + llm_workers)
+    urls = iter(urls)
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool, \
+            ThreadPoolExecutor(max_workers=llm_workers) as llm_pool:
+        started = {}
+        fetch_futures = set()
+        pending = set()
+        exhausted = False
+
+        while True:
+            # Top up the window from the input before waiting on anything
+            while not exhausted and len(pending) < window:
+                url = next(urls, None)
+                if url is None:
+                    exhausted = True
+                    break
+                result = SummaryResult(url)
+                started[id(result)] = time.perf_counter()
+                future = fetch_pool.submit(_extract, result, with_keywords)
+                fetch_futures.add(future)
+                pending.add(future)
+            if not pending:
+                return
+
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = future.result()
+                if future in fetch_futures:
+                    fetch_futures.discard(future)
+                    if not result.error:
+                        pending.add(llm_pool.submit(_summarize, result, summarize))
+                        continue
+                result.timings["total"] = time.perf_counter() - started.pop(id(result))
+                yield result
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+
+def read_urls(lines: Iterable[str]) -> List[str]:
+    """Unique URLs from a file, one per line; blank lines and ``#`` comments are ignored."""
+    urls, seen = [], set()
+    for line in lines:
+        url = line.strip()
+        if not url or url.startswith("#"):
+            continue
+        key = normalize_url(url)
+        if key not in seen:
+            seen.add(key)
+            urls.append(url)
+    return urls
+
+
+def completed_urls(path: str) -> Set[str]:
+    """Normalized URLs that already have a successful record in a JSONL checkpoint."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a torn last line from an interrupted run
+            if record.get("url") and not record.get("error"):
+                done.add(normalize_url(record["url"]))
+    return done
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize a list of article URLs into JSONL.")
+    parser.add_argument("input", help="File with one URL per line, or '-' for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout)")
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_FETCH_WORKERS)
+    parser.add_argument("--llm-workers", type=int, default=DEFAULT_LLM_WORKERS)
+    parser.add_argument("--model", default=GROQ_MODEL, help="Groq model name")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip URLs already summarized successfully in the output file")
+    parser.add_argument("--no-keywords", action="store_true", help="Skip keyword extraction")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    if not os.getenv("GROQ_API_KEY"):
+        parser.error("GROQ_API_KEY is not set")
+
+    if args.input == "-":
+        urls = read_urls(sys.stdin)
+    else:
+        with open(args.input, encoding="utf-8") as f:
+            urls = read_urls(f)
+
+    if args.resume:
+        if args.output == "-":
+            parser.error("--resume needs an output file")
+        done = completed_urls(args.output)
+        urls = [url for url in urls if normalize_url(url) not in done]
+        print(f"Resuming: {len(done)} already done, {len(urls)} remaining", file=sys.stderr)
+
+    summarize = cached_summarizer(make_llm(model_name=args.model), model_name=args.model)
+    out = sys.stdout if args.output == "-" else open(args.output, "a+", encoding="utf-8")
+    if out is not sys.stdout and out.tell() > 0:
+        # Terminate a torn last line left by an interrupted run
+        out.seek(out.tell() - 1)
+        if out.read(1) != "\n":
+            out.write("\n")
+    failures = 0
+    try:
+        for i, result in enumerate(iter_summaries(urls, summarize, args.fetch_workers,
+                                                  args.llm_workers, not args.no_keywords), 1):
+            out.write(json.dumps(result.to_record(), ensure_ascii=False) + "\n")
+            out.flush()
+            failures += bool(result.error)
+            status = f"error ({result.error})" if result.error else f"ok in {result.timings['total']:.1f}s"
+            print(f"[{i}/{len(urls)}] {result.url}: {status}", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"Done: {len(urls) - failures} succeeded, {failures} failed", file=sys.stderr)
+    return 1 if urls and failures == len(urls) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
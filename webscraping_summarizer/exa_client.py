@@ -0,0 +1,161 @@
+"""Pooled, cached client for the EXA Search API.
+
+Identical searches (same normalized query and parameters) within the TTL are
+answered from memory. Several queries can be fanned out concurrently and their
+results merged, with duplicates removed by canonical URL.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from article_cache import normalize_url
+from metrics import incr, timed
+
+# ---------------------------------------------------------------------------
+# CONFIGURATION
+# ---------------------------------------------------------------------------
+
+EXA_SEARCH_URL = "https://api.exa.ai/search"
+EXA_TIMEOUT = float(os.getenv("EXA_TIMEOUT", 15))
+EXA_CACHE_TTL = int(os.getenv("EXA_CACHE_TTL", 15 * 60))
+EXA_CACHE_MAX_ENTRIES = 512
+EXA_MAX_PARALLEL_QUERIES = 4
+
+DEFAULT_SEARCH_PARAMS = {
+    "includeDomains": ["bbc.com", "reuters.com", "cnn.com", "theverge.com", "techcrunch.com"],
+    "excludeDomains": [],
+    "useAutoprompt": True,
+    "type": "keyword",
+}
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def split_queries(text: str) -> List[str]:
+    """Split user input into individual queries (one per line or separated by ';')."""
+    queries = []
+    for line in text.replace(";", "\n").splitlines():
+        if line.strip() and normalize_query(line) not in map(normalize_query, queries):
+            queries.append(line.strip())
+    return queries
+
+
+class ExaSearchClient:
+    """Thin EXA client with a keep-alive session and a TTL/LRU result cache."""
+
+    def __init__(self, api_key: str, ttl: int = EXA_CACHE_TTL,
+                 max_entries: int = EXA_CACHE_MAX_ENTRIES, timeout: float = EXA_TIMEOUT):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=EXA_MAX_PARALLEL_QUERIES))
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_key(self, query: str, max_results: int, params: Dict) -> str:
+        return json.dumps([normalize_query(query), max_results, params], sort_keys=True)
+
+    def search(self, query: str, max_results: int = 5, **params) -> List[Dict[str, str]]:
+        """Search EXA for news articles; raises ``requests.RequestException`` on API errors."""
+        params = {**DEFAULT_SEARCH_PARAMS, **params}
+        key = self._cache_key(query, max_results, params)
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and now - cached[0] < self.ttl:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                incr("cache.exa.hits")
+                return list(cached[1])
+            self.misses += 1
+            incr("cache.exa.misses")
+
+        payload = {
+            "query": f"{query} news articles",
+            "numResults": min(max_results, 10),
+            **params,
+        }
+        with timed("search.exa"):
+            response = self.session.post(EXA_SEARCH_URL, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+
+        results = []
+        for item in response.json().get("results") or []:
+            link = item.get("url", "")
+            results.append({
+                "title": item.get("title", ""),
+                "link": link,
+                "snippet": item.get("text", "")[:200] + "..." if item.get("text") else "",
+                "source": urlparse(link).netloc,
+            })
+
+        with self._lock:
+            self._cache[key] = (now, results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return list(results)
+
+    def search_many(self, queries: List[str], max_results: int = 5, **params) -> List[Dict[str, str]]:
+        """Run several queries concurrently and merge results, deduplicated by canonical URL.
+
+        Results are interleaved by rank so every query contributes its best hits
+        first. A failing query is skipped unless all of them fail.
+        """
+        if not queries:
+            return []
+        if len(queries) == 1:
+            return self.search(queries[0], max_results, **params)
+
+        with ThreadPoolExecutor(max_workers=min(len(queries), EXA_MAX_PARALLEL_QUERIES)) as pool:
+            futures = [pool.submit(self.search, q, max_results, **params) for q in queries]
+        per_query, errors = [], []
+        for future in futures:
+            try:
+                per_query.append(future.result())
+            except requests.RequestException as e:
+                errors.append(e)
+        if errors and not per_query:
+            raise errors[0]
+
+        merged, seen = [], set()
+        for rank in range(max((len(r) for r in per_query), default=0)):
+            for results in per_query:
+                if rank < len(results):
+                    result = results[rank]
+                    canonical = normalize_url(result["link"]) if result["link"] else result["title"]
+                    if canonical not in seen:
+                        seen.add(canonical)
+                        merged.append(result)
+        return merged
+
+
+_clients: Dict[str, ExaSearchClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_exa_client(api_key: str) -> ExaSearchClient:
+    """Shared client per API key so the session and cache survive reruns."""
+    with _clients_lock:
+        if api_key not in _clients:
+            _clients[api_key] = ExaSearchClient(api_key)
+        return _clients[api_key]
@@ -0,0 +1,177 @@
+"""Shared async HTTP fetch layer for article downloads.
+
+A single ``httpx.AsyncClient`` runs on a background event loop so every
+Streamlit session, Gradio worker and batch thread reuses the same keep-alive
+connection pools. Requests to one host are capped by a per-host semaphore,
+HTTP/2 is negotiated when the ``h2`` package is installed, and transient
+failures are retried with exponential backoff.
+
+Synchronous callers use :func:`fetch` / :func:`fetch_many`; async code can
+await :meth:`AsyncFetcher.get` directly.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import threading
+from collections import defaultdict
+from typing import Dict, List
+from urllib.parse import urlparse
+
+import httpx
+
+from metrics import incr, timed
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# ---------------------------------------------------------------------------
+# CONFIGURATION
+# ---------------------------------------------------------------------------
+
+FETCH_CONNECT_TIMEOUT = float(os.getenv("FETCH_CONNECT_TIMEOUT", 5))
+FETCH_READ_TIMEOUT = float(os.getenv("FETCH_READ_TIMEOUT", 10))
+FETCH_TOTAL_TIMEOUT = float(os.getenv("FETCH_TOTAL_TIMEOUT", 20))
+FETCH_MAX_PER_HOST = int(os.getenv("FETCH_MAX_PER_HOST", 4))
+FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", 64))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", 2))
+FETCH_BACKOFF = float(os.getenv("FETCH_BACKOFF", 0.5))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 10.0
+
+# Browser-like headers; connection management and content encoding are left to httpx
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+
+# ---------------------------------------------------------------------------
+# ASYNC FETCHER
+# ---------------------------------------------------------------------------
+
+
+class AsyncFetcher:
+    """Pooled HTTP client with per-host concurrency limits and bounded retries."""
+
+    def __init__(self, connect_timeout: float = FETCH_CONNECT_TIMEOUT,
+                 read_timeout: float = FETCH_READ_TIMEOUT,
+                 total_timeout: float = FETCH_TOTAL_TIMEOUT,
+                 max_per_host: int = FETCH_MAX_PER_HOST,
+                 max_connections: int = FETCH_MAX_CONNECTIONS,
+                 retries: int = FETCH_RETRIES, backoff: float = FETCH_BACKOFF):
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.total_timeout = total_timeout
+        self.max_per_host = max_per_host
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.retries = retries
+        self.backoff = backoff
+        self._client = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(self.max_per_host))
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so the client binds to the loop that first uses it
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                headers=BROWSER_HEADERS,
+                timeout=self.timeout,
+                limits=self.limits,
+                follow_redirects=True,
+            )
+        return self._client
+
+    def _retry_delay(self, attempt: int, response: httpx.Response | None = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), MAX_RETRY_AFTER)
+        return self.backoff * (2 ** attempt) * (1 + random.random() / 2)
+
+    async def get(self, url: str, headers: Dict[str, str] | None = None) -> httpx.Response:
+        """GET ``url``, retrying timeouts, connection errors and 429/5xx responses.
+
+        Returns the final response (including 304 and non-retryable 4xx);
+        raises the last transport error once retries are exhausted.
+        """
+        host = urlparse(url).netloc.lower()
+        async with self._host_slots[host]:
+            with timed("article.download"):
+                return await self._get_with_retries(url, headers)
+
+    async def _get_with_retries(self, url: str, headers: Dict[str, str] | None) -> httpx.Response:
+        for attempt in range(self.retries + 1):
+            try:
+                response = await asyncio.wait_for(
+                    self.client.get(url, headers=headers), timeout=self.total_timeout
+                )
+            except (httpx.TransportError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+                incr("fetch.retries")
+                await asyncio.sleep(self._retry_delay(attempt))
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                incr("fetch.retries")
+                await asyncio.sleep(self._retry_delay(attempt, response))
+                continue
+            return response
+
+    async def get_many(self, urls: List[str]) -> List[httpx.Response | Exception]:
+        """Fetch several URLs concurrently; failures are returned in place."""
+        return await asyncio.gather(*(self.get(url) for url in urls), return_exceptions=True)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# ---------------------------------------------------------------------------
+# SHARED EVENT LOOP
+# ---------------------------------------------------------------------------
+
+_loop = None
+_fetcher = None
+_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="fetcher-loop", daemon=True).start()
+        return _loop
+
+
+def get_fetcher() -> AsyncFetcher:
+    """Process-wide fetcher whose client lives on the shared background loop."""
+    global _fetcher
+    with _lock:
+        if _fetcher is None:
+            _fetcher = AsyncFetcher()
+        return _fetcher
+
+
+def run_async(coro):
+    """Run a coroutine on the shared loop and block the calling thread for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
+
+
+def fetch(url: str, headers: Dict[str, str] | None = None) -> httpx.Response:
+    """Blocking wrapper around :meth:`AsyncFetcher.get` for thread-based callers."""
+    return run_async(get_fetcher().get(url, headers=headers))
+
+
+def fetch_many(urls: List[str]) -> List[httpx.Response | Exception]:
+    """Blocking wrapper around :meth:`AsyncFetcher.get_many`."""
+    return run_async(get_fetcher().get_many(urls))
@@ -0,0 +1,150 @@
+"""Fast keyword extraction used instead of newspaper3k's ``Article.nlp()``.
+
+Candidate phrases are found RAKE-style (runs of non-stopwords between
+stopwords and punctuation) and scored with word degree/frequency weighted by
+inverse document frequency, with NumPy over per-article word indices. IDF is
+precomputed with :meth:`KeywordExtractor.fit`; the shared extractor used by
+:func:`extract_keywords` is fitted on the articles in the summarizer cache
+(which every fetched article, including ``iter_summaries`` batches, goes
+through) and refitted whenever that corpus has doubled. With an empty cache
+every word gets the same IDF and scoring falls back to plain RAKE.
+"""
+from __future__ import annotations
+
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from article_cache import get_cache
+from metrics import timed
+
+# "fast" (default) uses KeywordExtractor; "newspaper" runs Article.nlp() when available
+KEYWORD_METHOD = os.getenv("KEYWORD_METHOD", "fast")
+MAX_PHRASE_WORDS = 3
+# Most recently used cached articles the shared extractor's IDF is fitted on
+IDF_CORPUS_SIZE = int(os.getenv("KEYWORD_IDF_CORPUS_SIZE", 2000))
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before
+being below between both but by can could did do does doing down during each even few for
+from further get got had has have having he her here hers herself him himself his how however
+i if in into is it its itself just like made make many may me might more most much must my
+myself new no nor not now of off on once one only or other our ours ourselves out over own
+per said same say says she should since so some still such than that the their theirs them
+themselves then there these they this those through to too under until up upon us very via
+was we were what when where which while who whom why will with within without would year
+years you your yours yourself yourselves
+""".split())
+
+_FRAGMENT_SPLIT = re.compile(r"[.,;:!?()\[\]{}\"“”‘’—–|/\n]+")
+_WORD = re.compile(r"[a-z0-9][a-z0-9'\-]*")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def candidate_phrases(text: str) -> Iterator[Tuple[str, ...]]:
+    """Yield runs of content words delimited by stopwords and punctuation."""
+    for fragment in _FRAGMENT_SPLIT.split(text):
+        phrase: List[str] = []
+        for word in _words(fragment):
+            if word in STOPWORDS or len(word) < 3 or word.isdigit():
+                if phrase:
+                    yield tuple(phrase)
+                    phrase = []
+            else:
+                phrase.append(word)
+        if phrase:
+            yield tuple(phrase)
+
+
+class KeywordExtractor:
+    """RAKE candidate phrases ranked with corpus-level IDF weights."""
+
+    def __init__(self, documents: Iterable[str] | None = None):
+        self.idf = {}
+        self.default_idf = 1.0
+        if documents is not None:
+            self.fit(documents)
+
+    def fit(self, documents: Iterable[str]) -> "KeywordExtractor":
+        """Precompute smoothed IDF over a corpus of article texts."""
+        doc_freq = Counter()
+        n_docs = 0
+        for document in documents:
+            n_docs += 1
+            doc_freq.update(set(_words(document)))
+        self.idf = {word: math.log((1 + n_docs) / (1 + count)) + 1 for word, count in doc_freq.items()}
+        self.default_idf = math.log(1 + n_docs) + 1
+        return self
+
+    def extract(self, text: str, top_n: int = 10) -> List[str]:
+        phrases = [p for p in candidate_phrases(text) if len(p) <= MAX_PHRASE_WORDS]
+        if not phrases:
+            return []
+
+        vocab = {}
+        words = np.array([vocab.setdefault(w, len(vocab)) for phrase in phrases for w in phrase])
+        lengths = np.array([len(phrase) for phrase in phrases])
+        freq = np.bincount(words, minlength=len(vocab))
+        degree = np.bincount(words, weights=np.repeat(lengths, lengths), minlength=len(vocab))
+        idf = np.array([self.idf.get(w, self.default_idf) for w in vocab])
+        word_score = degree / freq * np.log1p(freq) * idf
+
+        unique = list(dict.fromkeys(phrases))
+        starts = np.cumsum([0] + [len(phrase) for phrase in unique[:-1]])
+        phrase_score = np.add.reduceat(word_score[[vocab[w] for phrase in unique for w in phrase]], starts)
+
+        keywords = []
+        seen_words = set()
+        for i in np.argsort(-phrase_score, kind="stable"):
+            phrase = unique[i]
+            # Skip phrases that only repeat words already covered by a better one
+            if set(phrase) <= seen_words:
+                continue
+            seen_words.update(phrase)
+            keywords.append(" ".join(phrase))
+            if len(keywords) == top_n:
+                break
+        return keywords
+
+
+_default_extractor = KeywordExtractor()
+_fitted_on = 0
+_fit_lock = threading.Lock()
+
+
+def default_extractor() -> KeywordExtractor:
+    """Shared extractor, refitted on the cached articles whenever there are twice as many as last time."""
+    global _default_extractor, _fitted_on
+    count = get_cache().article_count()
+    if count >= max(1, 2 * _fitted_on):
+        with _fit_lock:
+            if count >= max(1, 2 * _fitted_on):
+                with timed("keywords.fit"):
+                    _default_extractor = KeywordExtractor(get_cache().article_texts(IDF_CORPUS_SIZE))
+                _fitted_on = count
+    return _default_extractor
+
+
+def extract_keywords(text: str, top_n: int = 10, extractor: KeywordExtractor | None = None) -> List[str]:
+    """Top ``top_n`` keyword phrases for ``text``."""
+    return (extractor or default_extractor()).extract(text, top_n)
+
+
+def article_keywords(article, top_n: int = 10, method: str = KEYWORD_METHOD) -> List[str]:
+    """Compute keywords for an article on first use and memoize them on the object."""
+    if not article.keywords:
+        if method == "newspaper" and hasattr(article, "nlp"):
+            with timed("article.nlp"):
+                article.nlp()
+        else:
+            with timed("article.keywords"):
+                article.keywords = extract_keywords(article.text, top_n)
+    return article.keywords[:top_n]
@@ -0,0 +1,187 @@
+"""Per-stage latency spans and counters for the summarizer pipeline.
+
+Stages are timed with :func:`timed` (context manager or decorator) and kept
+in a rolling window per stage for p50/p95/p99; counters track events such as
+cache hits, retries and token usage. Data is exposed as a JSON report
+(:func:`report`), as Prometheus text (:func:`prometheus_text`), and over HTTP
+when ``METRICS_PORT`` is set (``/metrics`` and ``/metrics.json``).
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ContextDecorator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", 1000))
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+QUANTILES = (0.5, 0.95, 0.99)
+
+_lock = threading.Lock()
+_samples: Dict[str, deque] = defaultdict(lambda: deque(maxlen=METRICS_WINDOW))
+_totals: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])  # lifetime count, sum
+_counters: Dict[str, float] = defaultdict(float)
+
+
+# ---------------------------------------------------------------------------
+# RECORDING
+# ---------------------------------------------------------------------------
+
+
+def observe(stage: str, seconds: float) -> None:
+    with _lock:
+        _samples[stage].append(seconds)
+        totals = _totals[stage]
+        totals[0] += 1
+        totals[1] += seconds
+
+
+def incr(counter: str, amount: float = 1) -> None:
+    with _lock:
+        _counters[counter] += amount
+
+
+class timed(ContextDecorator):
+    """Record the wall time of a block or function under ``stage``; failures also bump ``<stage>.errors``."""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def _recreate_cm(self):
+        # A decorator instance is shared by every call; each call times itself on a fresh instance
+        return type(self)(self.stage)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.stage, time.perf_counter() - self._start)
+        if exc_type is not None:
+            incr(f"{self.stage}.errors")
+        return False
+
+
+# ---------------------------------------------------------------------------
+# REPORTING
+# ---------------------------------------------------------------------------
+
+
+def _quantile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def report() -> dict:
+    """Rolling-window latency stats per stage plus lifetime counters."""
+    with _lock:
+        samples = {stage: sorted(values) for stage, values in _samples.items() if values}
+        totals = {stage: list(values) for stage, values in _totals.items()}
+        counters = dict(_counters)
+    stages = {}
+    for stage, values in sorted(samples.items()):
+        stages[stage] = {
+            "count": totals[stage][0],
+            "window": len(values),
+            "mean": sum(values) / len(values),
+            "p50": _quantile(values, 0.5),
+            "p95": _quantile(values, 0.95),
+            "p99": _quantile(values, 0.99),
+            "max": values[-1],
+        }
+    return {"generated_at": time.time(), "stages": stages, "counters": dict(sorted(counters.items()))}
+
+
+def report_json() -> str:
+    return json.dumps(report(), indent=2)
+
+
+def _metric_name(name: str) -> str:
+    return name.replace(".", "_").replace("-", "_")
+
+
+def prometheus_text() -> str:
+    """Prometheus exposition format: one summary for stages, one counter family per event."""
+    data = report()
+    lines = [
+        "# HELP summarizer_stage_seconds Latency of each pipeline stage (rolling window quantiles).",
+        "# TYPE summarizer_stage_seconds summary",
+    ]
+    with _lock:
+        totals = {stage: list(values) for stage, values in _totals.items()}
+    for stage, stats in data["stages"].items():
+        for q in QUANTILES:
+            value = stats[f"p{int(q * 100)}"]
+            lines.append(f'summarizer_stage_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+        lines.append(f'summarizer_stage_seconds_count{{stage="{stage}"}} {totals[stage][0]}')
+        lines.append(f'summarizer_stage_seconds_sum{{stage="{stage}"}} {totals[stage][1]:.6f}')
+    for counter, value in data["counters"].items():
+        name = f"summarizer_{_metric_name(counter)}_total"
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def markdown_table() -> str:
+    """Compact Markdown rendering of :func:`report` for the UIs."""
+    data = report()
+    if not data["stages"]:
+        return "No requests recorded yet."
+    lines = ["| Stage | Count | p50 (s) | p95 (s) | Max (s) |", "|---|---:|---:|---:|---:|"]
+    for stage, s in data["stages"].items():
+        lines.append(f"| {stage} | {s['count']} | {s['p50']:.3f} | {s['p95']:.3f} | {s['max']:.3f} |")
+    if data["counters"]:
+        lines += ["", "| Counter | Value |", "|---|---:|"]
+        lines += [f"| {name} | {value:g} |" for name, value in data["counters"].items()]
+    return "\n".join(lines)
+
+
+def reset() -> None:
+    with _lock:
+        _samples.clear()
+        _totals.clear()
+        _counters.clear()
+
+
+# ---------------------------------------------------------------------------
+# HTTP ENDPOINT
+# ---------------------------------------------------------------------------
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") == "/metrics":
+            body, content_type = prometheus_text(), "text/plain; version=0.0.4"
+        elif self.path.rstrip("/") == "/metrics.json":
+            body, content_type = report_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+
+
+def start_metrics_server(port: int | str | None = METRICS_PORT, host: str = METRICS_HOST):
+    """Serve metrics in a daemon thread; no-op without a port or if already running."""
+    global _server
+    with _lock:
+        if _server is not None or not port:
+            return _server
+        _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+    threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
@@ -0,0 +1,82 @@
+"""Background prefetching of search results.
+
+As soon as a search returns, the top result URLs are downloaded and parsed
+(and optionally summarized) on a shared worker pool. Everything lands in the
+persistent cache, so summarizing one of those results afterwards is a cache hit.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Callable, Dict, Iterable, Optional
+
+from article_cache import fetch_article, normalize_url
+
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", 4))
+MIN_ARTICLE_CHARS = 50
+
+
+class Prefetcher:
+    """Deduplicating background fetch/summarize queue keyed by canonical URL."""
+
+    def __init__(self, max_workers: int = PREFETCH_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._jobs: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _run(self, url: str, summarize: Optional[Callable[[str], str]]) -> str:
+        article = fetch_article(url)
+        if summarize and article.text and len(article.text.strip()) >= MIN_ARTICLE_CHARS:
+            summarize(article.text)
+            return "summarized"
+        return "extracted"
+
+    def prefetch(self, urls: Iterable[str], summarize: Optional[Callable[[str], str]] = None) -> None:
+        """Queue URLs unless they are in flight or already done to the requested stage.
+
+        ``summarize`` must not touch the UI; it runs on a worker thread.
+        """
+        with self._lock:
+            for url in urls:
+                key = normalize_url(url)
+                job = self._jobs.get(key)
+                if job is not None:
+                    if not job.done():
+                        continue
+                    if not job.exception() and (summarize is None or job.result() == "summarized"):
+                        continue
+                self._jobs[key] = self._pool.submit(self._run, url, summarize)
+
+    def wait(self, url: str, timeout: Optional[float] = None) -> None:
+        """Block until an in-flight job for ``url`` finishes, so its work is reused not repeated."""
+        with self._lock:
+            job = self._jobs.get(normalize_url(url))
+        if job is not None:
+            try:
+                job.exception(timeout=timeout)
+            except TimeoutError:
+                pass
+
+    def status(self, url: str) -> Optional[str]:
+        """``None`` if never queued, else 'pending', 'extracted', 'summarized' or 'failed'."""
+        with self._lock:
+            job = self._jobs.get(normalize_url(url))
+        if job is None:
+            return None
+        if not job.done():
+            return "pending"
+        return "failed" if job.exception() else job.result()
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher() -> Prefetcher:
+    """Process-wide prefetcher shared by all sessions."""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher()
+        return _prefetcher
@@ -0,0 +1,161 @@
+"""Token-aware summarization pipeline shared by both summarizer interfaces.
+
+Articles that fit comfortably in the model's context go through a single
+``prompt | llm`` call. Longer texts are split into token-bounded chunks that
+are summarized concurrently (map) and the section notes are then summarized
+into the final bullet list with the caller's prompt (reduce). The final call
+can also be streamed token by token for the UIs.
+"""
+from __future__ import annotations
+
+import os
+import re
+import time
+from typing import Iterator, List
+
+from langchain.prompts import PromptTemplate
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from metrics import incr, observe, timed
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _ENCODING = None
+
+# ---------------------------------------------------------------------------
+# CONFIGURATION
+# ---------------------------------------------------------------------------
+
+# llama3-8b-8192 has an 8k window; leave room for the prompt and the answer
+SINGLE_PASS_TOKENS = int(os.getenv("SUMMARY_SINGLE_PASS_TOKENS", 6000))
+CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", 2500))
+CHUNK_OVERLAP_TOKENS = 150
+MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", 4))
+MAX_COLLAPSE_ROUNDS = 3
+
+# Prompt template for summarization
+summary_prompt = PromptTemplate(
+    input_variables=["text"],
+    template="""You are a professional article summarizer. Please summarize the following article in 5 clear, informative bullet points. Focus on the main points, key insights, and important details:
+
+{text}
+
+Provide a concise summary in bullet points:"""
+)
+
+# Prompt for the map stage of long articles
+map_prompt = PromptTemplate(
+    input_variables=["text"],
+    template="""You are summarizing one section of a longer article. List the key facts, arguments and figures from this section as short bullet points. Skip navigation text, ads and other boilerplate:
+
+{text}
+
+Key points from this section:"""
+)
+
+
+# ---------------------------------------------------------------------------
+# TOKENS & CHUNKING
+# ---------------------------------------------------------------------------
+
+
+def count_tokens(text: str) -> int:
+    """Approximate the model's token count (tiktoken when installed, else ~4 chars/token)."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def clean_text(text: str) -> str:
+    """Collapse whitespace and drop repeated paragraphs (share bars, captions, etc.)."""
+    seen = set()
+    paragraphs = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = re.sub(r"[ \t]+", " ", paragraph).strip()
+        if paragraph and paragraph not in seen:
+            seen.add(paragraph)
+            paragraphs.append(paragraph)
+    return "\n\n".join(paragraphs)
+
+
+def split_into_chunks(text: str, chunk_tokens: int = CHUNK_TOKENS,
+                      overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[str]:
+    """Split on paragraph/sentence boundaries into chunks of at most ``chunk_tokens``."""
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_tokens,
+        chunk_overlap=overlap_tokens,
+        length_function=count_tokens,
+        separators=["\n\n", "\n", ". ", " ", ""],
+    )
+    return splitter.split_text(text)
+
+
+# ---------------------------------------------------------------------------
+# SUMMARIZATION
+# ---------------------------------------------------------------------------
+
+
+def _count_llm_tokens(prompt_text: str, completion: str, calls: int = 1) -> None:
+    incr("llm.calls", calls)
+    incr("llm.prompt_tokens", count_tokens(prompt_text))
+    incr("llm.completion_tokens", count_tokens(completion))
+
+
+def _map_sections(llm, texts: List[str], max_concurrency: int) -> List[str]:
+    chain = map_prompt | llm
+    with timed("summary.map"):
+        results = chain.batch([{"text": t} for t in texts], config={"max_concurrency": max_concurrency})
+    notes = [result.content for result in results]
+    _count_llm_tokens("".join(texts), "".join(notes), calls=len(texts))
+    return notes
+
+
+def _reduce_input(llm, text: str, max_concurrency: int) -> str:
+    """Return the text for the final prompt: the article itself, or its section notes."""
+    text = clean_text(text)
+    if count_tokens(text) <= SINGLE_PASS_TOKENS:
+        return text
+
+    notes = "\n\n".join(_map_sections(llm, split_into_chunks(text), max_concurrency))
+
+    # Very long articles can produce more notes than fit in one reduce call
+    for _ in range(MAX_COLLAPSE_ROUNDS):
+        if count_tokens(notes) <= SINGLE_PASS_TOKENS:
+            break
+        notes = "\n\n".join(_map_sections(llm, split_into_chunks(notes), max_concurrency))
+    return notes
+
+
+def summarize_text(llm, prompt: PromptTemplate, text: str,
+                   max_concurrency: int = MAP_CONCURRENCY) -> str:
+    """Summarize ``text`` with ``prompt``, switching to map-reduce for long inputs."""
+    with timed("summary.total"):
+        reduce_input = _reduce_input(llm, text, max_concurrency)
+        with timed("summary.llm"):
+            summary = (prompt | llm).invoke({"text": reduce_input}).content
+    _count_llm_tokens(reduce_input, summary)
+    return summary
+
+
+def stream_summary(llm, prompt: PromptTemplate, text: str,
+                   max_concurrency: int = MAP_CONCURRENCY) -> Iterator[str]:
+    """Same as :func:`summarize_text` but yields the final summary chunk by chunk.
+
+    For long articles the map stage still runs to completion first; only the
+    reduce call is streamed.
+    """
+    start = time.perf_counter()
+    reduce_input = _reduce_input(llm, text, max_concurrency)
+    llm_start = time.perf_counter()
+    parts = []
+    for chunk in (prompt | llm).stream({"text": reduce_input}):
+        if chunk.content:
+            if not parts:
+                observe("summary.first_token", time.perf_counter() - start)
+            parts.append(chunk.content)
+            yield chunk.content
+    observe("summary.llm", time.perf_counter() - llm_start)
+    observe("summary.total", time.perf_counter() - start)
+    _count_llm_tokens(reduce_input, "".join(parts))
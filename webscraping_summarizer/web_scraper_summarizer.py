@@ -1,13 +1,18 @@
 import os
 from dotenv import load_dotenv
-from newspaper import Article
 import streamlit as st
 from langchain_groq import ChatGroq
-from langchain.prompts import PromptTemplate
 import requests
 from urllib.parse import urlparse
 import time
 import json
+from article_cache import fetch_article, get_cache, summary_key
+# The summary prompt is shared with the bulk CLI so cached summaries are reused
+from summarization import stream_summary, summarize_text, summary_prompt as prompt
+from keywords import article_keywords
+from exa_client import get_exa_client, split_queries
+from prefetch import get_prefetcher
+import metrics
 
 # Load environment variables with verbose output
 load_dotenv(verbose=True)
@@ -15,40 +20,48 @@ load_dotenv(verbose=True)
 # Initialize components
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 EXA_API_KEY = os.getenv("EXA_API_KEY")
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama3-8b-8192")
 
-# Debug: Check environment variables (only show in sidebar)
-def debug_env_vars():
-    with st.sidebar.expander("🔧 Debug Info", expanded=True):
-        st.write("**Environment Variables:**")
-        st.write(f"GROQ_API_KEY: {'✅ Set' if GROQ_API_KEY else '❌ Missing'}")
-        st.write(f"EXA_API_KEY: {'✅ Set' if EXA_API_KEY else '❌ Missing'}")
+# Expose /metrics and /metrics.json when METRICS_PORT is set
+metrics.start_metrics_server()
+
+def performance_panel():
+    """Sidebar panel with per-stage latency percentiles and pipeline counters"""
+    with st.sidebar.expander("📈 Performance", expanded=False):
+        st.caption(f"GROQ_API_KEY: {'✅ Set' if GROQ_API_KEY else '❌ Missing'} · "
+                   f"EXA_API_KEY: {'✅ Set' if EXA_API_KEY else '❌ Missing'}")
         
-        # Show actual values (masked for security)
-        st.write("**Raw Values (first 10 chars):**")
-        st.write(f"GROQ_API_KEY: {GROQ_API_KEY[:10] + '...' if GROQ_API_KEY else 'None'}")
-        st.write(f"EXA_API_KEY: {EXA_API_KEY[:10] + '...' if EXA_API_KEY else 'None'}")
+        data = metrics.report()
+        if not data["stages"]:
+            st.write("No requests recorded yet.")
+            return
         
-        # Check if .env file exists
-        import pathlib
-        env_path = pathlib.Path('.env')
-        st.write(f"**.env file exists:** {'✅ Yes' if env_path.exists() else '❌ No'}")
-        if env_path.exists():
-            st.write(f"**.env file size:** {env_path.stat().st_size} bytes")
+        st.dataframe(
+            [
+                {"Stage": stage, "Count": s["count"], "p50 (s)": round(s["p50"], 3),
+                 "p95 (s)": round(s["p95"], 3), "Max (s)": round(s["max"], 3)}
+                for stage, s in data["stages"].items()
+            ],
+            hide_index=True,
+            use_container_width=True
+        )
+        if data["counters"]:
+            st.dataframe(
+                [{"Counter": name, "Value": value} for name, value in data["counters"].items()],
+                hide_index=True,
+                use_container_width=True
+            )
+        st.download_button(
+            "⬇️ Download JSON report",
+            metrics.report_json(),
+            file_name="summarizer_metrics.json",
+            mime="application/json"
+        )
 
 # Initialize Groq LLM
 llm = ChatGroq(
     groq_api_key=GROQ_API_KEY,
-    model_name="llama3-8b-8192"
-)
-
-# Prompt template for summarization
-prompt = PromptTemplate(
-    input_variables=["text"],
-    template="""You are a professional article summarizer. Please summarize the following article in 5 clear, informative bullet points. Focus on the main points, key insights, and important details:
-
-{text}
-
-Provide a concise summary in bullet points:"""
+    model_name=GROQ_MODEL
 )
 
 def is_valid_url(url):
@@ -77,20 +90,8 @@ def extract_article_content(url):
             st.write("- HTML-based content")
             return None
         
-        # Add headers to mimic a real browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
-        
-        article = Article(url)
-        article.download()
-        article.parse()
-        article.nlp()
+        # Served from the persistent cache when possible (see article_cache.py)
+        article = fetch_article(url)
         
         # Debug information
         st.write(f"📊 Article Info:")
@@ -132,38 +133,10 @@ def search_articles_exa(query, max_results=5):
             st.warning("⚠️ Please enter a search term, not a URL. For direct URL processing, use the main input field.")
             return None
             
-        # EXA Search API endpoint
-        url = "https://api.exa.ai/search"
-        
-        headers = {
-            "Authorization": f"Bearer {EXA_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        # EXA Search parameters
-        params = {
-            "query": f"{query} news articles",
-            "numResults": min(max_results, 10),
-            "includeDomains": ["bbc.com", "reuters.com", "cnn.com", "theverge.com", "techcrunch.com"],
-            "excludeDomains": [],
-            "useAutoprompt": True,
-            "type": "keyword"
-        }
-        
-        response = requests.post(url, headers=headers, json=params)
-        response.raise_for_status()
-        
-        data = response.json()
+        # Several queries separated by ';' are run concurrently and merged
+        results = get_exa_client(EXA_API_KEY).search_many(split_queries(query), max_results)
         
-        if 'results' in data and data['results']:
-            results = []
-            for item in data['results']:
-                results.append({
-                    'title': item.get('title', ''),
-                    'link': item.get('url', ''),
-                    'snippet': item.get('text', '')[:200] + '...' if item.get('text') else '',
-                    'source': urlparse(item.get('url', '')).netloc
-                })
+        if results:
             return results
         else:
             st.warning("No search results found.")
@@ -176,16 +149,36 @@ def search_articles_exa(query, max_results=5):
         st.error(f"Search failed: {str(e)}")
         return None
 
-def generate_summary(text):
-    """Generate summary using the updated LangChain approach"""
+def summarize_with_cache(text):
+    """Return the cached summary or generate and cache one (no UI calls, safe off-thread)"""
+    cache = get_cache()
+    key = summary_key(prompt.template, GROQ_MODEL, text)
+    cached = cache.get_summary(key)
+    if cached is not None:
+        return cached
+    
+    # Single call for normal articles, parallel map-reduce for long ones
+    summary = summarize_text(llm, prompt, text)
+    cache.put_summary(key, summary)
+    return summary
+
+def generate_summary_stream(text):
+    """Yield the summary chunk by chunk for st.write_stream"""
+    cache = get_cache()
+    key = summary_key(prompt.template, GROQ_MODEL, text)
+    cached = cache.get_summary(key)
+    if cached is not None:
+        yield cached
+        return
+    
+    parts = []
     try:
-        # Use the new LangChain pattern instead of deprecated LLMChain
-        chain = prompt | llm
-        result = chain.invoke({"text": text})
-        return result.content
+        for chunk in stream_summary(llm, prompt, text):
+            parts.append(chunk)
+            yield chunk
+        cache.put_summary(key, "".join(parts))
     except Exception as e:
         st.error(f"Failed to generate summary: {str(e)}")
-        return None
 
 # Streamlit UI
 st.set_page_config(
@@ -204,19 +197,33 @@ with st.sidebar:
     
     if search_mode:
         st.info("💡 **Try this example:** Search for 'Multimedia Misinformation' to find articles about fake news in images and videos")
-        search_query = st.text_input("Search for articles:", placeholder="e.g., Multimedia Misinformation")
+        search_query = st.text_input("Search for articles:", placeholder="e.g., Multimedia Misinformation", help="Separate several queries with ';' to search them in parallel")
         max_results = st.slider("Max search results:", 1, 10, 5)
         
+        prefetch_count = st.slider("⚡ Prefetch top results:", 0, 10, 3, help="Start extracting the top results in the background as soon as the search returns")
+        presummarize = st.checkbox("🤖 Pre-generate summaries", value=True, help="Also summarize prefetched articles so clicking Summarize is instant (uses extra Groq calls)")
+        
         # Show API status
         if EXA_API_KEY:
             st.success("✅ EXA Search API configured")
         else:
             st.error("❌ EXA Search API not configured")
     
-    # Debug information
-    debug_env_vars()
+    show_keywords = st.checkbox("🏷️ Extract keywords", value=True, help="Keyword extraction runs only when enabled")
+    
+    # Per-stage latency and counters
+    performance_panel()
+    
+    # Cache statistics
+    with st.expander("🗄️ Cache", expanded=False):
+        for layer, stats in get_cache().stats().items():
+            st.write(f"**{layer.title()}:** {stats['hits']} hits / {stats['misses']} misses, "
+                     f"{stats['entries']} entries ({stats['bytes'] / 1024:.0f} KB)")
+        if st.button("🧹 Clear cache"):
+            get_cache().clear()
 
 # Main content
+selected_url = None
 if search_mode:
     if search_query:
         st.subheader(f"🔍 Search Results for: {search_query}")
@@ -225,18 +232,33 @@ if search_mode:
             search_results = search_articles_exa(search_query, max_results)
             
         if search_results:
+            # Start extracting (and optionally summarizing) the top hits in the background
+            prefetcher = get_prefetcher()
+            prefetcher.prefetch(
+                [r['link'] for r in search_results[:prefetch_count] if r['link']],
+                summarize=summarize_with_cache if presummarize else None
+            )
+            
             st.write(f"Found {len(search_results)} articles:")
             
             for i, result in enumerate(search_results, 1):
-                with st.expander(f"📄 {result['title']}", expanded=False):
+                status = prefetcher.status(result['link'])
+                badge = {"pending": " ⏳", "extracted": " ⚡", "summarized": " ⚡🤖"}.get(status, "")
+                with st.expander(f"📄 {result['title']}{badge}", expanded=False):
                     st.write(f"**Source:** {result['source']}")
                     st.write(f"**URL:** {result['link']}")
                     st.write(f"**Snippet:** {result['snippet']}")
                     
+                    col_summarize, col_copy = st.columns(2)
+                    with col_summarize:
+                        if st.button(f"🚀 Summarize {i}", key=f"summarize_{i}"):
+                            selected_url = result['link']
+                    
                     # Add copy button for URL
-                    if st.button(f"📋 Copy URL {i}", key=f"copy_{i}"):
-                        st.write("URL copied to clipboard!")
-                        st.code(result['link'])
+                    with col_copy:
+                        if st.button(f"📋 Copy URL {i}", key=f"copy_{i}"):
+                            st.write("URL copied to clipboard!")
+                            st.code(result['link'])
         
         st.markdown("---")
         st.subheader("📝 Enter Article URL")
@@ -250,10 +272,17 @@ else:
     st.info("💡 **Try this example:** [BBC Article about Instagram Fact-Checking](https://www.bbc.com/news/blogs-trending-49449005)")
     url = st.text_input("Enter article URL:", placeholder="https://www.bbc.com/news/blogs-trending-49449005")
 
-# Process URL
-if st.button("🚀 Summarize Article", type="primary"):
+# Process URL (main button, or a "Summarize" button on a search result)
+summarize_clicked = st.button("🚀 Summarize Article", type="primary")
+if selected_url:
+    url = selected_url
+    summarize_clicked = True
+
+if summarize_clicked:
     if url and is_valid_url(url):
         with st.spinner("Extracting article content..."):
+            # Reuse an in-flight prefetch instead of downloading the page twice
+            get_prefetcher().wait(url, timeout=60)
             article = extract_article_content(url)
             
         if article:
@@ -272,17 +301,16 @@ if st.button("🚀 Summarize Article", type="primary"):
             with st.expander("📄 Full Article Text", expanded=False):
                 st.write(article.text)
                 
-            # Generate summary
-            with st.spinner("🤖 Generating AI summary..."):
-                summary = generate_summary(article.text)
-                if summary:
-                    st.subheader("🔍 AI Summary")
-                    st.markdown(summary)
+            # Generate summary (streamed token by token)
+            st.subheader("🔍 AI Summary")
+            st.write_stream(generate_summary_stream(article.text))
                     
-            # Show keywords
-            if article.keywords:
-                st.subheader("🏷️ Keywords")
-                st.write(", ".join(article.keywords[:10]))  # Show first 10 keywords
+            # Show keywords (computed on demand)
+            if show_keywords:
+                keywords = article_keywords(article)
+                if keywords:
+                    st.subheader("🏷️ Keywords")
+                    st.write(", ".join(keywords))
                 
             # Show metadata
             with st.expander("📊 Article Metadata"):